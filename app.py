@@ -1,10 +1,11 @@
 import streamlit as st
-import requests
+import http_session
 import pandas as pd
 import time
 from datetime import datetime
 import ta
 from ta.trend import EMAIndicator, SMAIndicator
+from symbol_universe import SymbolUniverse
 if 'scan_results' not in st.session_state:
     st.session_state.scan_results = {
         'bullish': [],
@@ -47,23 +48,25 @@ def fully_fanned(df: pd.DataFrame, type_: str, periods: list) -> str:
         return 'neutral'
 
 # === BINANCE API UTILS ===
-def get_futures_symbols():
-    res = requests.get(f"{BASE_URL}/fapi/v1/exchangeInfo").json()
-    symbols = [
-        s['symbol']
-        for s in res['symbols']
-        if s['contractType'] == 'PERPETUAL'
-        and s['quoteAsset'] == 'USDT'
-        and s['status'] == 'TRADING'
-        and not s['symbol'].endswith('BUSD')
-    ]
-    return symbols[:TEST_SYMBOLS_COUNT] if TEST_MODE else symbols
+def fetch_json(path):
+    response = http_session.get(f"{BASE_URL}{path}")
+    response.raise_for_status()
+    return response.json()
+
+# exchangeInfo is cached on disk and only re-downloaded when the listing changes
+@st.cache_resource
+def get_symbol_universe():
+    return SymbolUniverse(fetch_json)
+
+def get_futures_symbols(test_mode=TEST_MODE):
+    symbols = [s for s in get_symbol_universe().symbols() if not s.endswith('BUSD')]
+    return symbols[:TEST_SYMBOLS_COUNT] if test_mode else symbols
 
 def fetch_ohlcv(symbol, interval, limit=150):
     try:
         url = f"{BASE_URL}/fapi/v1/klines"
         params = {"symbol": symbol, "interval": interval, "limit": limit}
-        response = requests.get(url, params=params)
+        response = http_session.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         df = pd.DataFrame(data, columns=[
@@ -153,14 +156,8 @@ st.subheader("🔬 Test a Single Token (e.g. BTCUSDT)")
 test_symbol = st.text_input("Enter a symbol (optional)", "")
 if test_symbol:
     test_symbol = test_symbol.strip().upper()
-    valid_symbols = get_futures_symbols()
-    if TEST_MODE:
-        valid_symbols = requests.get(f"{BASE_URL}/fapi/v1/exchangeInfo").json()['symbols']
-        valid_symbols = [s['symbol'] for s in valid_symbols 
-                        if s['contractType'] == 'PERPETUAL'
-                        and s['quoteAsset'] == 'USDT'
-                        and s['status'] == 'TRADING']
-    
+    valid_symbols = get_futures_symbols(test_mode=False)  # the whole universe, even in test mode
+
     if test_symbol not in valid_symbols:
         st.error(f"{test_symbol} is not a valid Binance USDT Perpetual symbol")
     else:
@@ -0,0 +1,263 @@
+"""Replay the v5 classification rules over archived 15m/1h/4h candles.
+
+    python backtest.py --download --start 2024-01-01 --end 2025-01-01   # fill backtest_archive/ first
+    python backtest.py --start 2024-01-01 --end 2025-01-01 --out backtest_results.csv
+
+Every 15m close is one evaluation, as if classify_token ran the moment that candle
+closed. The 1h and 4h candles are still forming then, so their MAs and RSI are the
+last closed candle's state advanced by the current price, the same view the live
+scanner has. Nothing reads a higher-timeframe candle before it would have existed.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import http_session
+
+from batch_indicators import MA_CONFIG, RSI_PERIOD, CATEGORIES, TIMEFRAMES, fan_direction, bucket_masks
+from candle_archive import CandleArchive
+from kline_cache import INTERVAL_MS, CLOSE_TIME
+from rate_limiter import limiter, request_weight, DEFAULT_BAN_SECONDS
+
+# === CONFIG ===
+BASE_URL = "https://fapi.binance.com"
+BACKTEST_ARCHIVE_DIR = "backtest_archive"  # uncapped, unlike the live scanner's archive
+BACKFILL_PAGE = 1000  # 200 candles per weight unit; 1500 costs 10 for 150 per unit
+WARMUP_BARS = 300  # extra candles before --start so the 100-period MAs have settled
+FORWARD_HORIZONS = {'fwd_1h': 4, 'fwd_4h': 16, 'fwd_1d': 96}  # in 15m bars
+SIDE = {'bullish_in_range': 1, 'bullish_range_break': 1, 'bearish_in_range': -1, 'bearish_range_break': -1}
+
+
+# === BACKFILL ===
+def fetch_json(path, params=None):
+    limiter.acquire(request_weight(path, params))
+    response = http_session.get(f"{BASE_URL}{path}", params=params)
+    limiter.update_from_headers(response.headers)
+    if response.status_code == 429:
+        limiter.backoff(int(response.headers.get('Retry-After', 10)))
+    elif response.status_code == 418:  # IP banned
+        limiter.backoff(int(response.headers.get('Retry-After', DEFAULT_BAN_SECONDS)))
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_klines(params):
+    return fetch_json("/fapi/v1/klines", params)
+
+
+def get_futures_symbols():
+    exchange_info = fetch_json("/fapi/v1/exchangeInfo")
+    return [
+        s['symbol']
+        for s in exchange_info['symbols']
+        if s['contractType'] == 'PERPETUAL'
+        and s['quoteAsset'] == 'USDT'
+        and s['status'] == 'TRADING'
+    ]
+
+
+def backfill(archive, symbols, start_ms, end_ms, fetch=fetch_klines):
+    """Page closed candles for [start - warm-up, end) into the archive, resuming where it stops."""
+    now_ms = int(time.time() * 1000)
+    for i, symbol in enumerate(symbols):
+        for interval in TIMEFRAMES:
+            step = INTERVAL_MS[interval]
+            begin = start_ms - WARMUP_BARS * step
+            have = archive.read(symbol, interval, columns=['open_time'])
+            if have is not None and have.num_rows and have['open_time'][0].as_py() <= begin:
+                begin = have['open_time'][-1].as_py() + step
+            else:
+                archive.clear(symbol, interval)  # starts too late to extend backwards; rebuild
+
+            while begin < end_ms:
+                rows = fetch({"symbol": symbol, "interval": interval, "startTime": begin,
+                              "endTime": end_ms - 1, "limit": BACKFILL_PAGE})
+                closed = [row for row in rows if row[CLOSE_TIME] < now_ms]
+                if not closed:
+                    break
+                archive.append(symbol, interval, closed, contiguous=True)
+                begin = closed[-1][0] + step
+        print(f"backfilled {symbol} ({i + 1}/{len(symbols)})")
+
+
+# === VECTORIZED INDICATORS ===
+def wilder_averages(closes, period=RSI_PERIOD):
+    """Running Wilder up/down averages as ta's RSIIndicator builds them (first move counts as 0)."""
+    diff = np.diff(closes, prepend=closes[:1])
+    up, down = np.clip(diff, 0, None), np.clip(-diff, 0, None)
+    smooth = lambda x: pd.Series(x).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return smooth(up), smooth(down)
+
+
+def rsi_from(avg_up, avg_down):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+
+
+def closed_signals(closes, ma_type, periods):
+    """Fan direction and RSI on every candle of a series evaluated at its own closes."""
+    count = np.arange(1, len(closes) + 1)
+    series = pd.Series(closes)
+    if ma_type == 'ema':
+        ma = [series.ewm(span=p, adjust=False).mean().to_numpy() for p in periods]
+    else:
+        ma = [series.rolling(p).mean().to_numpy() for p in periods]
+    ma = np.stack([np.where(count >= p, m, np.nan) for m, p in zip(ma, periods)])
+    rsi = np.where(count >= RSI_PERIOD, rsi_from(*wilder_averages(closes)), np.nan)
+    return fan_direction(ma), rsi
+
+
+def forming_signals(open_time, closes, ma_type, periods, step, at_open, price):
+    """Higher-timeframe fan and RSI at each evaluation, with its forming candle closing at `price`.
+
+    `at_open` are the open times of the 15m candles being evaluated. The forming candle
+    is the one containing them; everything before it is closed and indexed by `j`.
+    """
+    forming_open = at_open // step * step
+    j = np.searchsorted(open_time, forming_open - step)
+    found = (j < len(open_time)) & (open_time[np.minimum(j, len(open_time) - 1)] == forming_open - step)
+    j = np.where(found, j, 0)
+    count = np.where(found, j + 2, 0)  # closed candles so far plus the forming one
+
+    ma = []
+    csum = np.concatenate([[0.0], np.cumsum(closes)])
+    for p in periods:
+        if ma_type == 'ema':
+            alpha = 2.0 / (p + 1.0)
+            prev = pd.Series(closes).ewm(span=p, adjust=False).mean().to_numpy()[j]
+            value = prev + alpha * (price - prev)
+        else:
+            value = (csum[j + 1] - csum[np.maximum(j + 2 - p, 0)] + price) / p
+        ma.append(np.where(count >= p, value, np.nan))
+
+    avg_up, avg_down = wilder_averages(closes)
+    move = price - closes[j]
+    alpha = 1.0 / RSI_PERIOD
+    up = avg_up[j] + alpha * (np.clip(move, 0, None) - avg_up[j])
+    down = avg_down[j] + alpha * (np.clip(-move, 0, None) - avg_down[j])
+    rsi = np.where(count >= RSI_PERIOD, rsi_from(up, down), np.nan)
+    return fan_direction(np.stack(ma)), rsi
+
+
+# === BACKTEST ===
+def bucket_codes(candles, apply_momentum_filter=True, apply_rsi_filter=True):
+    """Bucket per 15m candle: 0 for none, else 1 + index into CATEGORIES."""
+    m15_open, m15_close = candles["15m"]
+    trend = np.zeros((len(m15_close), 3), dtype=np.int8)
+    rsi = np.empty((len(m15_close), 3))
+    trend[:, 0], rsi[:, 0] = closed_signals(m15_close, *MA_CONFIG["15m"])
+    for col, interval in ((1, "1h"), (2, "4h")):
+        open_time, closes = candles[interval]
+        trend[:, col], rsi[:, col] = forming_signals(
+            open_time, closes, *MA_CONFIG[interval], INTERVAL_MS[interval], m15_open, m15_close)
+
+    masks = bucket_masks(trend, rsi, apply_momentum_filter, apply_rsi_filter)
+    codes = np.zeros(len(m15_close), dtype=np.int8)
+    for k, category in enumerate(CATEGORIES):
+        codes[masks[category]] = k + 1
+    return codes
+
+
+def bucket_events(symbol, candles, codes, start_ms, end_ms):
+    """One row per stay in a bucket that began inside [start, end), with returns in its direction."""
+    open_time, close = candles["15m"]
+    close_time = open_time + INTERVAL_MS["15m"]
+    changes = np.flatnonzero(np.diff(codes, prepend=0) != 0)
+    exits = np.append(changes[1:], -1)  # -1: still in the bucket at the end of the data
+
+    events = []
+    for entry, exit_ in zip(changes, exits):
+        if codes[entry] == 0 or not start_ms <= close_time[entry] < end_ms:
+            continue
+        category = CATEGORIES[codes[entry] - 1]
+        side = SIDE[category]
+        event = {
+            'symbol': symbol,
+            'category': category,
+            'entry_time': close_time[entry],
+            'entry_price': close[entry],
+            'exit_time': close_time[exit_] if exit_ >= 0 else None,
+            'exit_price': close[exit_] if exit_ >= 0 else None,
+            'bars_held': (exit_ if exit_ >= 0 else len(codes)) - entry,
+            'trade_return': side * (close[exit_] / close[entry] - 1) if exit_ >= 0 else np.nan,
+        }
+        for name, bars in FORWARD_HORIZONS.items():
+            ahead = entry + bars
+            event[name] = side * (close[ahead] / close[entry] - 1) if ahead < len(close) else np.nan
+        events.append(event)
+    return events
+
+
+def load_candles(archive, symbol):
+    candles = {}
+    for interval in TIMEFRAMES:
+        table = archive.read(symbol, interval, columns=['open_time', 'close'])
+        if table is None or not table.num_rows:
+            return None
+        candles[interval] = (table['open_time'].to_numpy(), table['close'].to_numpy())
+    return candles
+
+
+def run_backtest(archive, symbols, start_ms, end_ms, apply_momentum_filter=True, apply_rsi_filter=True):
+    events = []
+    for symbol in symbols:
+        candles = load_candles(archive, symbol)
+        if candles is None:
+            print(f"Skipping {symbol}: not in the archive for every timeframe")
+            continue
+        codes = bucket_codes(candles, apply_momentum_filter, apply_rsi_filter)
+        events.extend(bucket_events(symbol, candles, codes, start_ms, end_ms))
+
+    df = pd.DataFrame(events, columns=['symbol', 'category', 'entry_time', 'entry_price', 'exit_time',
+                                       'exit_price', 'bars_held', 'trade_return', *FORWARD_HORIZONS])
+    for column in ('entry_time', 'exit_time'):
+        df[column] = pd.to_datetime(df[column], unit='ms', utc=True)
+    return df
+
+
+def summarize(df):
+    """Per-bucket entry count, mean returns and share of positive 1d forward returns."""
+    grouped = df.groupby('category')
+    summary = grouped[['bars_held', 'trade_return', *FORWARD_HORIZONS]].mean()
+    summary.insert(0, 'entries', grouped.size())
+    summary['hit_rate_1d'] = grouped['fwd_1d'].apply(lambda r: (r.dropna() > 0).mean())
+    return summary.reindex([c for c in CATEGORIES if c in summary.index])
+
+
+def to_ms(day):
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help="UTC date, YYYY-MM-DD (default: a year before --end)")
+    parser.add_argument("--end", help="UTC date, YYYY-MM-DD (default: now)")
+    parser.add_argument("--symbols", nargs="*", help="default: every symbol in the archive")
+    parser.add_argument("--archive", default=BACKTEST_ARCHIVE_DIR)
+    parser.add_argument("--download", action="store_true", help="backfill the archive from Binance first")
+    parser.add_argument("--no-momentum", action="store_true", help="run with the momentum filter off")
+    parser.add_argument("--no-rsi", action="store_true", help="run with the RSI filter off")
+    parser.add_argument("--out", default="backtest_results.csv")
+    args = parser.parse_args()
+
+    end_ms = to_ms(args.end) if args.end else int(time.time() * 1000)
+    start_ms = to_ms(args.start) if args.start else end_ms - 365 * INTERVAL_MS["1d"]
+    archive = CandleArchive(args.archive, max_candles=None)
+
+    if args.download:
+        backfill(archive, args.symbols or get_futures_symbols(), start_ms, end_ms)
+    symbols = args.symbols or archive.symbols("15m")
+
+    started = time.perf_counter()
+    df = run_backtest(archive, symbols, start_ms, end_ms, not args.no_momentum, not args.no_rsi)
+    df.to_csv(args.out, index=False)
+    print(f"✅ {len(df)} bucket entries across {df['symbol'].nunique()} symbols "
+          f"in {time.perf_counter() - started:.1f}s -> {args.out}")
+    if len(df):
+        print(summarize(df).to_string(float_format=lambda x: f"{x:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+
+from strategy_rules import V5_RULES, TREND_CODES, compile_rules
+from kline_window import kline_windows
+
+# === CONFIG ===
+RULES = compile_rules(V5_RULES)  # bucket rules, MA fans and RSI period all come from the spec
+TIMEFRAMES = RULES.timeframes
+MA_CONFIG = RULES.ma_config
+RSI_PERIOD = RULES.rsi_period
+CATEGORIES = RULES.categories
+SIGNAL_KEYS = ['m15', 'h1', 'h4']  # signal dict prefixes, one per timeframe
+KLINE_WINDOWS = kline_windows(MA_CONFIG, RSI_PERIOD)  # candles to fetch per timeframe for these indicators
+
+BULLISH, NEUTRAL, BEARISH = TREND_CODES['bullish'], TREND_CODES['neutral'], TREND_CODES['bearish']
+
+
+# === PACKING ===
+def pack_closes(frames, timeframes=TIMEFRAMES):
+    """Pack {symbol: {interval: closes}} into a (symbols x timeframes x candles) float64 array.
+
+    Shorter series are right-aligned and left-padded with their first close. A flat
+    prefix leaves the EMA and Wilder averages exactly where they would start on the
+    real data, and `lengths` masks windows the series is too short for.
+    """
+    symbols = list(frames)
+    series = [[np.asarray(frames[s][tf], dtype=np.float64) for tf in timeframes] for s in symbols]
+    lengths = np.array([[len(c) for c in row] for row in series], dtype=np.int64).reshape(len(symbols), len(timeframes))
+    n = int(lengths.max()) if lengths.size else 0
+
+    closes = np.empty((len(symbols), len(timeframes), n), dtype=np.float64)
+    for i, row in enumerate(series):
+        for j, c in enumerate(row):
+            if len(c):
+                closes[i, j, :n - len(c)] = c[0]
+                closes[i, j, n - len(c):] = c
+            else:
+                closes[i, j, :] = np.nan
+    return symbols, closes, lengths
+
+
+# === INDICATORS (last value only) ===
+def last_ema(closes, periods, lengths):
+    """EMA (adjust=False, as ta's EMAIndicator) of every series, for each period. Shape (P, ...)."""
+    alpha = (2.0 / (np.asarray(periods, dtype=np.float64) + 1.0)).reshape((-1,) + (1,) * (closes.ndim - 1))
+    value = np.broadcast_to(closes[..., 0], alpha.shape[:1] + closes.shape[:-1]).copy()
+    for t in range(1, closes.shape[-1]):
+        value += alpha * (closes[..., t] - value)
+    return _mask_short(value, periods, lengths)
+
+
+def last_sma(closes, periods, lengths):
+    """Simple moving average of the last `period` closes for each period. Shape (P, ...)."""
+    value = np.stack([closes[..., -p:].mean(axis=-1) for p in periods])
+    return _mask_short(value, periods, lengths)
+
+
+def last_rsi(closes, lengths, period=RSI_PERIOD):
+    """Wilder RSI (as ta's RSIIndicator) of the last candle of every series."""
+    diff = np.diff(closes, axis=-1)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+
+    alpha = 1.0 / period
+    avg_up = np.zeros(closes.shape[:-1])
+    avg_down = np.zeros(closes.shape[:-1])
+    for t in range(diff.shape[-1]):
+        avg_up += alpha * (up[..., t] - avg_up)
+        avg_down += alpha * (down[..., t] - avg_down)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    return np.where(lengths >= period, rsi, np.nan)
+
+
+def _mask_short(value, periods, lengths):
+    short = lengths[None, ...] < np.asarray(periods).reshape((-1,) + (1,) * lengths.ndim)
+    return np.where(short, np.nan, value)
+
+
+def fan_direction(ma):
+    """Fan verdict per series from stacked (3, ...) MA values: 1 bullish, -1 bearish, 0 neutral."""
+    bull = (ma[0] > ma[1]) & (ma[1] > ma[2])
+    bear = (ma[0] < ma[1]) & (ma[1] < ma[2])
+    return np.where(bull, BULLISH, np.where(bear, BEARISH, NEUTRAL))
+
+
+# === BATCH ENGINE ===
+def compute_signals_batch(closes, lengths, timeframes=TIMEFRAMES):
+    """Fan direction and last RSI per (symbol, timeframe), both shaped (S, T)."""
+    trend = np.zeros(closes.shape[:2], dtype=np.int8)
+    # Timeframes sharing an MA type and periods go through one call; a spec may give each its own periods
+    groups = {}
+    for j, tf in enumerate(timeframes):
+        ma_type, periods = MA_CONFIG[tf]
+        groups.setdefault((ma_type, tuple(periods)), []).append(j)
+    for (ma_type, periods), idx in groups.items():
+        calc = last_ema if ma_type == "ema" else last_sma
+        trend[:, idx] = fan_direction(calc(closes[:, idx, :], periods, lengths[:, idx]))
+    return trend, last_rsi(closes, lengths)
+
+
+def bucket_masks(trend, rsi, apply_momentum_filter=True, apply_rsi_filter=True, rules=RULES):
+    """Compiled bucket rules over (S, 3) signals -> {category: bool mask (S,)}."""
+    return rules.masks(trend, rsi, apply_momentum_filter, apply_rsi_filter)
+
+
+def signals_batch(frames, timeframes=TIMEFRAMES):
+    """Per-symbol signals in the same shape as the scanners' compute_signals().
+
+    With a subset of `timeframes`, only their keys are computed (and `frames` need only
+    hold those), so a caller can refresh one timeframe without redoing the others.
+    """
+    if not frames:
+        return {}
+    symbols, closes, lengths = pack_closes(frames, timeframes)
+    trend, rsi = compute_signals_batch(closes, lengths, timeframes)
+    names = {BULLISH: 'bullish', NEUTRAL: 'neutral', BEARISH: 'bearish'}
+    keys = [SIGNAL_KEYS[TIMEFRAMES.index(tf)] for tf in timeframes]
+    out = {}
+    for i, symbol in enumerate(symbols):
+        signals = {f'{key}_trend': names[int(trend[i, j])] for j, key in enumerate(keys)}
+        signals.update({f'{key}_rsi': float(rsi[i, j]) for j, key in enumerate(keys)})
+        out[symbol] = signals
+    return out
+
+
+def classify_batch(frames, apply_momentum_filter=True, apply_rsi_filter=True):
+    """Classify every symbol in one pass. `frames` maps symbol -> {interval: closes}.
+
+    Returns the same four buckets classify_token produces, as lists of symbols.
+    """
+    if not frames:
+        return {category: [] for category in CATEGORIES}
+    symbols, closes, lengths = pack_closes(frames)
+    trend, rsi = compute_signals_batch(closes, lengths)
+    masks = bucket_masks(trend, rsi, apply_momentum_filter, apply_rsi_filter)
+    return {category: [symbols[i] for i in np.flatnonzero(masks[category])] for category in CATEGORIES}
+
+
+def classify_signals(results, apply_momentum_filter=True, apply_rsi_filter=True, rules=RULES):
+    """Bucket already computed {symbol: signals} (compute_signals / signals_batch shape) in one pass."""
+    symbols = list(results)
+    trend = np.array([[TREND_CODES.get(results[s][f'{key}_trend'], NEUTRAL) for key in SIGNAL_KEYS] for s in symbols],
+                     dtype=np.int8).reshape(len(symbols), len(SIGNAL_KEYS))
+    rsi = np.array([[results[s][f'{key}_rsi'] for key in SIGNAL_KEYS] for s in symbols],
+                   dtype=np.float64).reshape(len(symbols), len(SIGNAL_KEYS))
+    masks = bucket_masks(trend, rsi, apply_momentum_filter, apply_rsi_filter, rules)
+    return {category: [symbols[i] for i in np.flatnonzero(masks[category])] for category in rules.categories}
@@ -0,0 +1,479 @@
+"""Scan pipeline benchmarks replayed against a local stand-in for fapi.binance.com.
+
+    python bench_scan.py                          # synthetic fixtures, every scenario
+    python bench_scan.py --record 100             # capture real exchangeInfo/klines first
+    python bench_scan.py --symbols 100 --latency-ms 40 --error-rate 0.02 --scenario sync
+
+Each scenario runs in its own process so peak RSS, caches and the shared weight
+limiter don't leak between them, and in a scratch working directory so the scanners'
+latest_* exports, symbol universe and history files never land in the checkout.
+"""
+import argparse
+import ast
+import asyncio
+import gzip
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import requests
+
+from kline_cache import INTERVAL_MS
+from rate_limiter import limiter, request_weight
+
+# === CONFIG ===
+BASE_URL = "https://fapi.binance.com"
+FIXTURE_DIR = "bench_fixtures"
+INTERVALS = ["15m", "1h", "4h"]
+FIXTURE_CANDLES = 2500  # covers the 15m depth the resample mode asks for
+SYNC_SCRIPT = "trendscan_v5-autolive.py"
+ASYNC_SCRIPT = "trendscan_v2-RSI_speed2_stablev2.py"
+SCENARIOS = ["indicators", "sync", "async"]
+
+
+# === FIXTURES ===
+def record_fixtures(n, fixture_dir=FIXTURE_DIR):
+    """Save exchangeInfo and FIXTURE_CANDLES klines per interval for the first `n` symbols."""
+    os.makedirs(os.path.join(fixture_dir, "klines"), exist_ok=True)
+    exchange_info = requests.get(f"{BASE_URL}/fapi/v1/exchangeInfo", timeout=10).json()
+    with open(os.path.join(fixture_dir, "exchangeInfo.json"), "w") as f:
+        json.dump(exchange_info, f)
+
+    symbols = [
+        s['symbol'] for s in exchange_info['symbols']
+        if s['contractType'] == 'PERPETUAL' and s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING'
+    ][:n]
+    for i, symbol in enumerate(symbols):
+        for interval in INTERVALS:
+            rows = []
+            while len(rows) < FIXTURE_CANDLES:
+                params = {"symbol": symbol, "interval": interval, "limit": min(FIXTURE_CANDLES - len(rows), 1500)}
+                if rows:
+                    params["endTime"] = rows[0][0] - 1
+                limiter.acquire(request_weight("klines", params))
+                page = requests.get(f"{BASE_URL}/fapi/v1/klines", params=params, timeout=10).json()
+                if not page:
+                    break
+                rows = page + rows
+            with open(os.path.join(fixture_dir, "klines", f"{symbol}_{interval}.json"), "w") as f:
+                json.dump(rows, f)
+        print(f"recorded {symbol} ({i + 1}/{len(symbols)})")
+
+
+def synthetic_fixtures(n):
+    """Deterministic random-walk candles, trending enough that every bucket gets hits."""
+    symbols = [f"SYN{i:03d}USDT" for i in range(n)]
+    exchange_info = {'symbols': [
+        {'symbol': s, 'contractType': 'PERPETUAL', 'quoteAsset': 'USDT', 'status': 'TRADING'} for s in symbols
+    ]}
+    klines = {}
+    for symbol in symbols:
+        for interval in INTERVALS:
+            rng = np.random.default_rng(zlib.crc32(f"{symbol}{interval}".encode()))
+            step = INTERVAL_MS[interval]
+            closes = 100 * np.exp(np.cumsum(rng.normal(rng.normal(0, 0.003), 0.01, FIXTURE_CANDLES)))
+            volume = 10 ** np.random.default_rng(zlib.crc32(symbol.encode())).uniform(2.5, 4.5)  # liquid to dead
+            klines[(symbol, interval)] = [
+                [k * step, f"{c:.6f}", f"{c * 1.004:.6f}", f"{c * 0.996:.6f}", f"{c:.6f}", f"{volume:.1f}",
+                 (k + 1) * step - 1, f"{c * volume:.2f}", 200, f"{volume / 2:.1f}", f"{c * volume / 2:.2f}", "0"]
+                for k, c in enumerate(closes)
+            ]
+    return exchange_info, klines
+
+
+def load_fixtures(n, fixture_dir=FIXTURE_DIR):
+    path = os.path.join(fixture_dir, "exchangeInfo.json")
+    if not os.path.exists(path):
+        return synthetic_fixtures(n)
+
+    with open(path) as f:
+        exchange_info = json.load(f)
+    klines = {}
+    for name in sorted(os.listdir(os.path.join(fixture_dir, "klines"))):
+        symbol, interval = name[:-len(".json")].rsplit("_", 1)
+        with open(os.path.join(fixture_dir, "klines", name)) as f:
+            klines[(symbol, interval)] = json.load(f)
+    symbols = sorted({symbol for symbol, _ in klines})[:n]
+    exchange_info['symbols'] = [s for s in exchange_info['symbols'] if s['symbol'] in symbols]
+    return exchange_info, {key: rows for key, rows in klines.items() if key[0] in symbols}
+
+
+# === STAND-IN SERVER ===
+class FakeBinance:
+    """Serves fixtures on localhost with injected latency and 429s, counting request weight.
+
+    Kline timestamps are shifted so the last fixture candle is the one forming right now,
+    which keeps startTime-based incremental fetches meaningful.
+    """
+
+    def __init__(self, exchange_info, klines, latency_ms=0, error_rate=0.0):
+        self.exchange_info = json.dumps(exchange_info).encode()
+        self.price_listing = json.dumps([{'symbol': s['symbol'], 'price': "1.0"} for s in exchange_info['symbols']]).encode()
+        self.klines = klines
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.stats = {'requests': 0, 'weight': 0, 'throttled': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+        self._random = random.Random(42)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def klines_body(self, params):
+        rows = self.klines.get((params.get('symbol'), params.get('interval')))
+        if rows is None:
+            return 400, json.dumps({"code": -1121, "msg": "Invalid symbol."}).encode()
+        step = INTERVAL_MS[params['interval']]
+        now = int(time.time() * 1000)
+        shift = (now // step * step) - rows[-1][0]
+        limit = min(int(params.get('limit', 500)), 1500)
+        if 'endTime' in params:
+            rows = [r for r in rows if r[0] <= int(params['endTime']) - shift]
+        if 'startTime' in params:
+            start = int(params['startTime']) - shift
+            selected = [r for r in rows if r[0] >= start][:limit]
+        else:
+            selected = rows[-limit:]
+        shifted = [[r[0] + shift] + r[1:6] + [r[6] + shift] + r[7:] for r in selected]
+        return 200, json.dumps(shifted, separators=(',', ':')).encode()
+
+    def ticker_body(self):
+        """All-symbols 24h ticker derived from the last day of 15m fixture candles."""
+        tickers = []
+        for (symbol, interval), rows in self.klines.items():
+            if interval != "15m":
+                continue
+            day = rows[-96:]
+            open_price, last = float(day[0][1]), float(day[-1][4])
+            tickers.append({
+                'symbol': symbol,
+                'lastPrice': day[-1][4],
+                'priceChangePercent': f"{(last / open_price - 1) * 100:.3f}",
+                'quoteVolume': f"{sum(float(r[7]) for r in day):.2f}",
+                'count': sum(int(r[8]) for r in day),
+            })
+        return 200, json.dumps(tickers).encode()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as Binance serves it
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                weight = request_weight(url.path, params)
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                with fake._lock:
+                    fake.stats['requests'] += 1
+                    fake.stats['weight'] += weight
+                    throttled = fake._random.random() < fake.error_rate
+                    if throttled:
+                        fake.stats['throttled'] += 1
+                    used = fake.stats['weight']
+
+                if throttled:
+                    status, body = 429, b'{"code":-1003,"msg":"Too many requests."}'
+                elif url.path.endswith('exchangeInfo'):
+                    status, body = 200, fake.exchange_info
+                elif url.path.endswith('klines'):
+                    status, body = fake.klines_body(params)
+                elif url.path.endswith('ticker/24hr'):
+                    status, body = fake.ticker_body()
+                elif url.path.endswith('ticker/price'):
+                    status, body = 200, fake.price_listing
+                else:
+                    status, body = 200, b'{}'
+
+                gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+                if gzipped:
+                    body = gzip.compress(body, compresslevel=1)
+                with fake._lock:
+                    fake.stats['bytes'] += len(body)  # on the wire
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-MBX-USED-WEIGHT-1M', str(used))
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+# === SCRIPT LOADING ===
+def load_script(path, base_url=None):
+    """Exec a Streamlit scanner's imports, CONSTANTS and function defs, skipping page code.
+
+    The scanner files have hyphenated names and run their UI at module level, so they
+    can't simply be imported. Functions resolve globals from the returned namespace,
+    which is how BASE_URL gets pointed at the stand-in server.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    def is_constant(node):
+        return isinstance(node, ast.Assign) and all(
+            isinstance(t, ast.Name) and t.id.isupper() for t in node.targets)
+
+    namespace = {'__name__': os.path.splitext(os.path.basename(path))[0], '__file__': path}
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+        elif is_constant(node):
+            try:
+                exec(compile(ast.Module(body=[node], type_ignores=[]), path, "exec"), namespace)
+            except Exception:
+                pass  # secrets and the like; the benchmark doesn't need them
+    if base_url:
+        namespace['BASE_URL'] = base_url
+    return namespace
+
+
+def unthrottle():
+    """Lift the shared limiter so runs measure the pipeline rather than Binance's budget."""
+    limiter.capacity = limiter.burst = 10 ** 9
+    limiter.rate = limiter.capacity / 60.0
+    limiter.tokens = float(limiter.burst)
+
+
+# === SCENARIOS ===
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float('nan')
+
+
+def summarize(name, latencies, elapsed, before=None, after=None):
+    result = {
+        'scenario': name,
+        'symbols': len(latencies),
+        'symbols_per_sec': len(latencies) / elapsed if elapsed else float('nan'),
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+    }
+    if before is not None:
+        result.update({key: after[key] - before[key] for key in after})
+    return result
+
+
+def bench_indicators(exchange_info, klines, args):
+    import pandas as pd
+    from batch_indicators import classify_batch
+    from kline_decode import rows_to_array, CLASSIFIER_FIELDS
+
+    ns = load_script(args.sync_script)
+    symbols = [s['symbol'] for s in exchange_info['symbols']]
+    arrays = {
+        symbol: {interval: rows_to_array(klines[(symbol, interval)][-150:], CLASSIFIER_FIELDS) for interval in INTERVALS}
+        for symbol in symbols
+    }
+
+    latencies = []
+    started = time.perf_counter()
+    for symbol in symbols:
+        t0 = time.perf_counter()
+        frames = {interval: pd.DataFrame(arr) for interval, arr in arrays[symbol].items()}
+        ns['compute_signals'](frames["15m"], frames["1h"], frames["4h"])
+        latencies.append(time.perf_counter() - t0)
+    results = [summarize("indicators (ta, per symbol)", latencies, time.perf_counter() - started)]
+
+    closes = {symbol: {interval: arr['close'] for interval, arr in by_tf.items()} for symbol, by_tf in arrays.items()}
+    t0 = time.perf_counter()
+    classify_batch(closes)
+    elapsed = time.perf_counter() - t0
+    batch = summarize("indicators (batch engine)", [], elapsed)
+    batch.update({'symbols': len(symbols), 'symbols_per_sec': len(symbols) / elapsed})
+    results.append(batch)
+    return results
+
+
+def bench_sync(exchange_info, klines, args):
+    server = FakeBinance(exchange_info, klines, args.latency_ms, args.error_rate).start()
+    ns = load_script(args.sync_script, server.url)
+    ns['ARCHIVE_DIR'] = tempfile.mkdtemp(prefix="bench_archive_")  # cold means cold
+    ns['RESAMPLE_FROM_15M'] = args.resample
+    symbols = [s['symbol'] for s in exchange_info['symbols']]
+
+    results = []
+    for label in ("cold", "warm rescan", "restart from archive"):
+        if label.startswith("restart") and ns.get('USE_CANDLE_ARCHIVE'):
+            ns['get_kline_cache']().clear()  # drop the in-memory windows, keep the files
+        elif label.startswith("restart"):
+            continue
+        before = server.snapshot()
+        latencies = []
+        started = time.perf_counter()
+        for symbol in symbols:
+            t0 = time.perf_counter()
+            ns['classify_token'](symbol, True, True)
+            latencies.append(time.perf_counter() - t0)
+        results.append(summarize(f"sync classify_token ({label})", latencies, time.perf_counter() - started,
+                                 before, server.snapshot()))
+    server.stop()
+    shutil.rmtree(ns['ARCHIVE_DIR'], ignore_errors=True)
+    return results
+
+
+def bench_async(exchange_info, klines, args):
+    import streamlit as st
+
+    server = FakeBinance(exchange_info, klines, args.latency_ms, args.error_rate).start()
+    ns = load_script(args.async_script, server.url)
+    ns['ARCHIVE_DIR'] = tempfile.mkdtemp(prefix="bench_archive_")
+    categories = ['bullish_in_range', 'bullish_range_break', 'bearish_in_range', 'bearish_range_break']
+    st.session_state.scan_results = {category: [] for category in categories}
+    st.session_state.scan_results['live_results'] = {category: [] for category in categories}
+
+    # Per-symbol latency: from the first fetch to the symbol's result
+    started_at, latencies = {}, []
+
+    def timed(name, symbol_arg, finish=False):
+        inner = ns.get(name)
+        if inner is None:
+            return False
+
+        async def wrapper(*a, **kw):
+            symbol = a[symbol_arg]
+            started_at.setdefault(symbol, time.perf_counter())
+            try:
+                return await inner(*a, **kw)
+            finally:
+                if finish:
+                    latencies.append(time.perf_counter() - started_at[symbol])
+        ns[name] = wrapper
+        return True
+
+    if not (timed('fetch_stage', 1) and timed('classify_one', 1, finish=True)):
+        timed('classify_token', 1, finish=True)  # older async scanners
+
+    before = server.snapshot()
+    started = time.perf_counter()
+    asyncio.run(ns['run_scanner_async']())
+    elapsed = time.perf_counter() - started
+    result = summarize("async run_scanner_async", latencies, elapsed, before, server.snapshot())
+    result['symbols'] = len(latencies) or len(exchange_info['symbols'])  # after any prefilter
+    result['symbols_per_sec'] = result['symbols'] / elapsed
+    server.stop()
+    shutil.rmtree(ns['ARCHIVE_DIR'], ignore_errors=True)
+    return [result]
+
+
+# === REPORT ===
+COLUMNS = [
+    ('scenario', 'scenario', 40, '{}'),
+    ('symbols', 'symbols', 7, '{:d}'),
+    ('symbols_per_sec', 'sym/s', 9, '{:.1f}'),
+    ('p50_ms', 'p50 ms', 8, '{:.2f}'),
+    ('p99_ms', 'p99 ms', 8, '{:.2f}'),
+    ('peak_rss_mb', 'RSS MB', 7, '{:.0f}'),
+    ('requests', 'reqs', 6, '{:d}'),
+    ('weight', 'weight', 6, '{:d}'),
+    ('throttled', '429s', 5, '{:d}'),
+    ('bytes', 'bytes', 10, '{:d}'),
+]
+
+
+def print_report(results):
+    print("  ".join(label.rjust(width) if i else label.ljust(width) for i, (_, label, width, _) in enumerate(COLUMNS)))
+    for row in results:
+        cells = []
+        for i, (name, _, width, fmt) in enumerate(COLUMNS):
+            value = row.get(name)
+            text = fmt.format(value) if value is not None and value == value else "-"
+            cells.append(text.rjust(width) if i else text.ljust(width))
+        print("  ".join(cells))
+
+
+def run_scenario(name, args):
+    exchange_info, klines = load_fixtures(args.symbols, args.fixtures)
+    if not args.real_limits:
+        unthrottle()
+    results = {'indicators': bench_indicators, 'sync': bench_sync, 'async': bench_async}[name](exchange_info, klines, args)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    for result in results:
+        result['peak_rss_mb'] = peak_rss_mb
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50, help="symbols to replay")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="run only these scenarios")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="recorded fixture directory")
+    parser.add_argument("--record", type=int, metavar="N", help="record fixtures for N symbols and exit")
+    parser.add_argument("--sync-script", default=SYNC_SCRIPT)
+    parser.add_argument("--async-script", default=ASYNC_SCRIPT)
+    parser.add_argument("--resample", action="store_true", help="sync scenario builds 1h/4h from 15m")
+    parser.add_argument("--real-limits", action="store_true", help="keep Binance's 2400/min weight budget")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record, args.fixtures)
+        return
+
+    if args.child:
+        # Paths are relative to the caller, so resolve them before moving to the scratch directory
+        args.fixtures, args.sync_script, args.async_script = (
+            os.path.abspath(path) for path in (args.fixtures, args.sync_script, args.async_script))
+        workdir = tempfile.mkdtemp(prefix="bench_run_")
+        os.chdir(workdir)
+        try:
+            print(json.dumps(run_scenario(args.child, args)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        child_args = [a for a in sys.argv[1:] if a != "--json"] + ["--child", name]
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__)] + child_args,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{name} failed:\n{proc.stderr}", file=sys.stderr)
+            continue
+        results.extend(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
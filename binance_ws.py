@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+from kline_cache import OPEN_TIME
+
+# === CONFIG ===
+WS_BASE_URL = "wss://fstream.binance.com"
+MAX_STREAMS_PER_CONNECTION = 200  # Binance futures cap per combined-stream connection
+RECONNECT_DELAY = 5  # seconds, doubled on each consecutive failure (max 60)
+UPDATE_DEBOUNCE = 1.0  # seconds to coalesce ticks before re-classifying a symbol
+
+
+def kline_event_to_row(k):
+    """Convert a websocket kline payload into the 12-field REST kline row layout."""
+    return [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'],
+            k['T'], k['q'], k['n'], k['V'], k['Q'], k['B']]
+
+
+# === STREAMING KLINE INGESTION ===
+class KlineStream:
+    """Rolling in-memory candle buffers fed by Binance combined kline streams.
+
+    Buffers are seeded once through `seed(symbol, interval)` (a REST call returning raw
+    kline rows), then kept current from `<symbol>@kline_<interval>` frames. Symbols whose
+    forming candle ticked are re-evaluated with `on_update(symbol, buffers)` at most once
+    per `debounce` seconds, immediately when a candle closes. Its return value is kept in
+    `results[symbol]`, and `on_evaluate(results)` runs after each batch. After a reconnect every buffer of that connection is re-fetched
+    through `seed` and spliced in, so candles that closed while offline are not skipped.
+    """
+
+    def __init__(self, symbols, intervals, seed, on_update, window=150,
+                 base_url=WS_BASE_URL, debounce=UPDATE_DEBOUNCE, on_evaluate=None):
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.seed = seed
+        self.on_update = on_update
+        self.window = window
+        self.base_url = base_url
+        self.debounce = debounce
+        self.on_evaluate = on_evaluate
+
+        self.buffers = {}  # (symbol, interval) -> list of raw kline rows
+        self.results = {}  # symbol -> last on_update() result
+        self.last_update = None
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+        self._wake = None
+        self._stopped = False
+
+    # --- buffers ---
+    def snapshot(self, symbol):
+        with self._lock:
+            return {interval: list(self.buffers.get((symbol, interval), []))
+                    for interval in self.intervals}
+
+    def apply_event(self, data):
+        """Merge one kline event into its buffer. Returns True if the candle closed."""
+        k = data['k']
+        key = (data['s'], k['i'])
+        row = kline_event_to_row(k)
+        with self._lock:
+            rows = self.buffers.get(key)
+            if rows is None:
+                return False  # not seeded (yet)
+            if rows and rows[-1][OPEN_TIME] == row[OPEN_TIME]:
+                rows[-1] = row
+            elif not rows or row[OPEN_TIME] > rows[-1][OPEN_TIME]:
+                rows.append(row)
+                del rows[:-self.window]
+            else:
+                return False  # stale frame
+            self._dirty.add(data['s'])
+        return bool(k['x'])
+
+    def merge_rows(self, key, rows):
+        """Splice REST rows into a buffer, keeping frames newer than the fetch."""
+        first, last = rows[0][OPEN_TIME], rows[-1][OPEN_TIME]
+        with self._lock:
+            current = self.buffers.get(key, [])
+            # Older rows only survive if they run on into the fetched ones without a gap
+            older = [row for row in current if row[OPEN_TIME] < first]
+            if not any(row[OPEN_TIME] == first for row in current):
+                older = []
+            merged = older + list(rows) + [row for row in current if row[OPEN_TIME] > last]
+            self.buffers[key] = merged[-self.window:]
+            self._dirty.add(key[0])
+
+    def _seed_all(self, keys=None):
+        for symbol, interval in keys or self.stream_keys():
+            if self._stopped:
+                return
+            try:
+                rows = self.seed(symbol, interval)
+            except Exception as e:
+                print(f"Error seeding {symbol} {interval}: {e}")
+                continue
+            if rows:
+                self.merge_rows((symbol, interval), rows)
+
+    # --- websocket side ---
+    def stream_keys(self):
+        return [(s, i) for s in self.symbols for i in self.intervals]
+
+    def stream_groups(self):
+        """[(url, keys)] with at most MAX_STREAMS_PER_CONNECTION streams per connection."""
+        keys = self.stream_keys()
+        groups = []
+        for n in range(0, len(keys), MAX_STREAMS_PER_CONNECTION):
+            chunk = keys[n:n + MAX_STREAMS_PER_CONNECTION]
+            url = f"{self.base_url}/stream?streams=" + "/".join(f"{s.lower()}@kline_{i}" for s, i in chunk)
+            groups.append((url, chunk))
+        return groups
+
+    async def _listen(self, url, keys):
+        delay = RECONNECT_DELAY
+        reconnect = False
+        while not self._stopped:
+            try:
+                async with websockets.connect(url, ping_interval=None, max_queue=None) as ws:
+                    delay = RECONNECT_DELAY
+                    if reconnect:
+                        # Frames queue on the socket meanwhile and are applied on top
+                        await self._loop.run_in_executor(None, self._seed_all, keys)
+                        self._wake.set()
+                    async for message in ws:
+                        data = json.loads(message).get('data')
+                        if data and data.get('e') == 'kline' and self.apply_event(data):
+                            self._wake.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Kline stream error ({e}), reconnecting in {delay}s")
+            if self._stopped:
+                break
+            reconnect = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    async def _dispatch(self):
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.debounce)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            if dirty:
+                # Off the event loop so frames keep being read while indicators compute
+                await self._loop.run_in_executor(None, self._evaluate, dirty)
+
+    def _evaluate(self, symbols):
+        for symbol in symbols:
+            buffers = self.snapshot(symbol)
+            if not all(buffers.values()):
+                continue
+            try:
+                self.results[symbol] = self.on_update(symbol, buffers)
+            except Exception as e:
+                print(f"Error updating {symbol}: {e}")
+        self.last_update = time.time()
+        if self.on_evaluate is not None:
+            try:
+                self.on_evaluate(dict(self.results))
+            except Exception as e:
+                print(f"Stream callback failed: {e}")
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        await self._loop.run_in_executor(None, self._seed_all)
+        tasks = [asyncio.create_task(self._listen(url, keys)) for url, keys in self.stream_groups()]
+        tasks.append(asyncio.create_task(self._dispatch()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # --- thread control ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: [t.cancel() for t in asyncio.all_tasks()])
@@ -0,0 +1,206 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from kline_cache import INTERVAL_MS, OPEN_TIME
+
+try:
+    import fcntl
+except ImportError:  # Windows: only writers within one process are serialized
+    fcntl = None
+
+# === CONFIG ===
+ARCHIVE_DIR = "candle_archive"
+ARCHIVE_MAX_CANDLES = 3000  # per (symbol, interval); ~31 days of 15m, ~500 days of 4h. None keeps all
+ARCHIVE_TAIL_CANDLES = 96  # new candles gathered in a side file before the main one is rewritten
+TAIL_SUFFIX = ".tail.arrow"
+
+# Binance kline row position -> archived column (the trailing "ignore" field is dropped)
+ARCHIVE_COLUMNS = [
+    ('open_time', 0, pa.int64()),
+    ('open', 1, pa.float64()),
+    ('high', 2, pa.float64()),
+    ('low', 3, pa.float64()),
+    ('close', 4, pa.float64()),
+    ('volume', 5, pa.float64()),
+    ('close_time', 6, pa.int64()),
+    ('quote_volume', 7, pa.float64()),
+    ('trades', 8, pa.int64()),
+    ('taker_buy_volume', 9, pa.float64()),
+    ('taker_buy_quote_volume', 10, pa.float64()),
+]
+ARCHIVE_SCHEMA = pa.schema([(name, kind) for name, _, kind in ARCHIVE_COLUMNS])
+
+
+def rows_to_table(rows):
+    """Raw kline rows (prices as strings or floats) -> Arrow table in ARCHIVE_SCHEMA."""
+    columns = []
+    for _, idx, kind in ARCHIVE_COLUMNS:
+        cast = int if pa.types.is_integer(kind) else float
+        columns.append(pa.array([cast(row[idx]) for row in rows], type=kind))
+    return pa.Table.from_arrays(columns, schema=ARCHIVE_SCHEMA)
+
+
+def table_to_rows(table):
+    """Arrow table -> 12-field kline rows, the layout KlineCache and the scanners expect."""
+    columns = [table.column(name).to_numpy().tolist() for name, _, _ in ARCHIVE_COLUMNS]
+    return [list(values) + ["0"] for values in zip(*columns)]
+
+
+# === CANDLE ARCHIVE ===
+class CandleArchive:
+    """Closed candles on disk as one Arrow IPC file per `<interval>/<SYMBOL>.arrow`.
+
+    Files are uncompressed so reads are memory-mapped and zero-copy: a restarted scanner
+    warms its KlineCache from here, and backtests can slice years of candles without
+    loading them. Candles that close after the main file was written go to a small
+    `<SYMBOL>.tail.arrow` beside it; only once `tail_candles` have gathered is the main
+    file rewritten with them. Every write goes through a uniquely named temp file and an
+    atomic replace, so readers never see a partial file, and appends hold a lock file per
+    interval so scanner processes sharing the directory don't drop each other's candles.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, max_candles=ARCHIVE_MAX_CANDLES, tail_candles=ARCHIVE_TAIL_CANDLES):
+        self.root = root
+        self.max_candles = max_candles
+        self.tail_candles = tail_candles
+        self._lock = threading.Lock()
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, interval, f"{symbol}.arrow")
+
+    def tail_path(self, symbol, interval):
+        return os.path.join(self.root, interval, f"{symbol}{TAIL_SUFFIX}")
+
+    def symbols(self, interval):
+        try:
+            names = os.listdir(os.path.join(self.root, interval))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".arrow")] for name in names
+                      if name.endswith(".arrow") and not name.endswith(TAIL_SUFFIX))
+
+    # --- reads ---
+    def _load(self, path):
+        try:
+            source = pa.memory_map(path, 'r')
+        except FileNotFoundError:
+            return None
+        return ipc.open_file(source).read_all()
+
+    def _parts(self, symbol, interval):
+        """(main table or None, tail table of candles newer than it or None)."""
+        main = self._load(self.path(symbol, interval))
+        if main is None:
+            return None, None
+        tail = self._load(self.tail_path(symbol, interval))
+        if tail is not None and main.num_rows:
+            # A tail left over from before the last merge only repeats what the main file holds
+            tail = tail.filter(pc.greater(tail['open_time'], main['open_time'][-1]))
+        return main, tail if tail is not None and tail.num_rows else None
+
+    def read(self, symbol, interval, tail=None, columns=None):
+        """Memory-mapped table of archived candles (oldest first), or None if there are none."""
+        main, new = self._parts(symbol, interval)
+        if main is None:
+            return None
+        table = main if new is None else pa.concat_tables([main, new])
+        if columns is not None:
+            table = table.select(columns)
+        if tail is not None:
+            table = table.slice(max(0, table.num_rows - tail))
+        return table
+
+    def closes(self, symbol, interval, tail=None):
+        table = self.read(symbol, interval, tail, columns=['close'])
+        return None if table is None else table.column('close').to_numpy()
+
+    def rows(self, symbol, interval, tail=None):
+        table = self.read(symbol, interval, tail)
+        return [] if table is None else table_to_rows(table)
+
+    # --- writes ---
+    @contextmanager
+    def _locked(self, interval):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            directory = os.path.join(self.root, interval)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, ".lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def append(self, symbol, interval, rows, contiguous=False):
+        """Add closed candles newer than the archive. Returns how many were written.
+
+        `contiguous` says `rows` continue straight from the archived ones (an incremental
+        fetch). Otherwise, rows that start past the next expected candle mean a gap, and
+        the file restarts from `rows` rather than hide the hole from backtests.
+        """
+        with self._locked(interval):
+            main, tail = self._parts(symbol, interval)
+            newest = tail if tail is not None else main
+            last = newest['open_time'][-1].as_py() if newest is not None and newest.num_rows else None
+
+            new = [row for row in rows if last is None or row[OPEN_TIME] > last]
+            if not new:
+                return 0
+            table = rows_to_table(new)
+            if last is not None and not contiguous and new[0][OPEN_TIME] > last + INTERVAL_MS[interval]:
+                main, tail = None, None
+
+            if main is None:
+                self._merge(symbol, interval, table)
+            elif tail is None or tail.num_rows + len(new) < self.tail_candles:
+                # Only the small tail file is rewritten per closed candle
+                self._write(self.tail_path(symbol, interval), table if tail is None else pa.concat_tables([tail, table]))
+            else:
+                self._merge(symbol, interval, pa.concat_tables([main, tail, table]))
+            return len(new)
+
+    def _merge(self, symbol, interval, table):
+        """Rewrite the main file as `table` (trimmed to max_candles) and drop the tail."""
+        if self.max_candles:
+            table = table.slice(max(0, table.num_rows - self.max_candles))
+        self._write(self.path(symbol, interval), table.combine_chunks())
+        try:
+            os.remove(self.tail_path(symbol, interval))
+        except FileNotFoundError:
+            pass
+
+    def _write(self, path, table):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Unique per writer, as several scanner processes may share one archive directory
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp, 'wb') as sink:
+                with ipc.new_file(sink, ARCHIVE_SCHEMA) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def clear(self, symbol=None, interval=None):
+        with self._lock:
+            intervals = [interval] if interval else os.listdir(self.root) if os.path.isdir(self.root) else []
+            for interval in intervals:
+                for name in self.symbols(interval):
+                    if symbol is None or name == symbol:
+                        os.remove(self.path(name, interval))
+                        try:
+                            os.remove(self.tail_path(name, interval))
+                        except FileNotFoundError:
+                            pass
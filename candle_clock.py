@@ -0,0 +1,62 @@
+import threading
+import time
+
+from kline_cache import INTERVAL_MS, OPEN_TIME, CLOSE_TIME
+
+# === CONFIG ===
+CLOSE_DELAY = 3  # seconds after a candle boundary before the closed candle is read
+
+
+def last_closed_open(interval, now_ms=None):
+    """Open time of the most recent candle of `interval` that has closed by `now_ms`."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    step = INTERVAL_MS[interval]
+    return now_ms // step * step - step
+
+
+def seconds_to_next_close(interval, now=None, delay=CLOSE_DELAY):
+    """Seconds until `delay` past the next `interval` boundary (UTC multiples, as Binance)."""
+    now = time.time() if now is None else now
+    step = INTERVAL_MS[interval] / 1000
+    return step - ((now - delay) % step)
+
+
+def closed_rows(rows, now_ms=None):
+    """Raw kline rows without the forming candle (the last row, if it hasn't closed yet)."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    if rows and rows[-1][CLOSE_TIME] >= now_ms:
+        return rows[:-1]
+    return rows
+
+
+# === CLOSE TRACKING ===
+class ClosedCandleTracker:
+    """Remembers the last closed candle evaluated per (symbol, interval).
+
+    A timeframe is `due` only once a newer candle should have closed, so between 15m
+    boundaries nothing is fetched or recomputed, and 1h/4h work happens only on their
+    own boundaries. A fetch that still ends on the evaluated candle (a listing gap, a
+    late close) leaves the pair due for the next pass.
+    """
+
+    def __init__(self):
+        self.evaluated = {}  # (symbol, interval) -> open time of the last closed candle evaluated
+        self._lock = threading.Lock()
+
+    def due(self, symbol, interval, now_ms=None):
+        return self.evaluated.get((symbol, interval)) != last_closed_open(interval, now_ms)
+
+    def is_new(self, symbol, interval, rows):
+        """Whether closed `rows` end on a candle this pair hasn't been evaluated on."""
+        return bool(rows) and self.evaluated.get((symbol, interval)) != rows[-1][OPEN_TIME]
+
+    def record(self, symbol, interval, rows):
+        with self._lock:
+            self.evaluated[(symbol, interval)] = rows[-1][OPEN_TIME]
+
+    def forget(self, symbols):
+        """Drop delisted or filtered-out symbols so they start fresh if they come back."""
+        keep = set(symbols)
+        with self._lock:
+            for key in [key for key in self.evaluated if key[0] not in keep]:
+                del self.evaluated[key]
@@ -0,0 +1,79 @@
+import pandas as pd
+from ta.trend import EMAIndicator, SMAIndicator
+from ta.momentum import RSIIndicator
+
+import kline_decode
+from batch_indicators import classify_signals, SIGNAL_KEYS
+from strategy_rules import V2_RULES, compile_rules
+
+# Everything in this module runs inside ProcessPoolExecutor workers, so it must stay
+# importable on its own (the Streamlit scripts can't be pickled by reference).
+
+# === DECODING ===
+def decode_klines(payload) -> pd.DataFrame:
+    """Raw /fapi/v1/klines response body (bytes or already-parsed list) -> DataFrame."""
+    return pd.DataFrame(kline_decode.decode_klines(payload, kline_decode.CLASSIFIER_FIELDS))
+
+# === MOVING AVERAGE UTILS ===
+def calculate_ema(df: pd.DataFrame, period: int) -> pd.Series:
+    return EMAIndicator(close=df['close'], window=period).ema_indicator()
+
+def calculate_sma(df: pd.DataFrame, period: int) -> pd.Series:
+    return SMAIndicator(close=df['close'], window=period).sma_indicator()
+
+def calculate_rsi(df: pd.DataFrame, period: int) -> pd.Series:
+    return RSIIndicator(close=df['close'], window=period).rsi()
+
+def fully_fanned(df: pd.DataFrame, type_: str, periods: list) -> str:
+    try:
+        if type_ == 'ema':
+            ma1 = calculate_ema(df, periods[0])
+            ma2 = calculate_ema(df, periods[1])
+            ma3 = calculate_ema(df, periods[2])
+        else:
+            ma1 = calculate_sma(df, periods[0])
+            ma2 = calculate_sma(df, periods[1])
+            ma3 = calculate_sma(df, periods[2])
+
+        if len(ma1) < 1 or len(ma2) < 1 or len(ma3) < 1:
+            return "incomplete"
+
+        last_ma1 = ma1.iloc[-1]
+        last_ma2 = ma2.iloc[-1]
+        last_ma3 = ma3.iloc[-1]
+
+        if last_ma1 > last_ma2 > last_ma3:
+            return "bullish"
+        elif last_ma1 < last_ma2 < last_ma3:
+            return "bearish"
+        return "neutral"
+
+    except Exception as e:
+        print(f"Error in fully_fanned: {e}")
+        return "error"
+
+# === CLASSIFICATION (RSI speed scanner rules) ===
+RULES = compile_rules(V2_RULES)  # fans, RSI period and buckets, 4h RSI caps included
+
+def compute_signals(frames):
+    """Fan verdict and last RSI per timeframe from {interval: DataFrame}, or None if an RSI is empty."""
+    signals = {}
+    for key, interval in zip(SIGNAL_KEYS, RULES.timeframes):
+        ma_type, periods = RULES.ma_config[interval]
+        rsi = calculate_rsi(frames[interval], RULES.rsi_period)
+        if rsi.empty:
+            return None
+        signals[f'{key}_trend'] = fully_fanned(frames[interval], ma_type, periods)
+        signals[f'{key}_rsi'] = float(rsi.iloc[-1])
+    return signals
+
+def classify_klines(symbol, m15_payload, h1_payload, h4_payload):
+    """Decode the three kline payloads for `symbol` and return its bucket or None."""
+    frames = dict(zip(RULES.timeframes, map(decode_klines, (m15_payload, h1_payload, h4_payload))))
+    signals = compute_signals(frames)
+    if signals is None:
+        print(f"Skipping {symbol}: RSI series is empty")
+        return None
+
+    buckets = classify_signals({symbol: signals}, rules=RULES)
+    return next((category for category in RULES.categories if buckets[category]), None)
@@ -0,0 +1,174 @@
+import math
+from collections import deque
+
+from batch_indicators import MA_CONFIG, RSI_PERIOD, TIMEFRAMES
+from kline_cache import OPEN_TIME
+
+CLOSE = 4  # close price position in a raw kline row
+SMA_RESYNC_EVERY = 1000  # closes between exact re-sums of the running SMA totals
+
+
+# === RUNNING INDICATORS ===
+class IndicatorState:
+    """Running MA fan + Wilder RSI for one (symbol, timeframe), updated in O(1) per candle.
+
+    `close_candle(c)` commits a closed candle. `preview(c)` evaluates as if the forming
+    candle closed at `c` without committing, so ticks cost the same as closes. Matches
+    ta's EMAIndicator(adjust=False) / SMAIndicator / RSIIndicator last values over every
+    candle fed since construction, including their NaN warm-up.
+    """
+
+    def __init__(self, ma_type, periods, rsi_period=RSI_PERIOD):
+        self.ma_type = ma_type
+        self.periods = list(periods)
+        self.rsi_period = rsi_period
+        self.count = 0
+
+        self.ema = [0.0] * len(self.periods)
+        self.alpha = [2.0 / (p + 1.0) for p in self.periods]
+        self.window = deque(maxlen=max(self.periods))  # last closes, for SMA drop-offs
+        self.sums = [0.0] * len(self.periods)
+        self._since_resync = 0
+
+        self.prev_close = None
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+
+    # --- updates ---
+    def close_candle(self, close):
+        close = float(close)
+        self.ema, self.sums = self._ma_step(close)
+        self.avg_up, self.avg_down = self._rsi_step(close)
+        self.window.append(close)
+        self.prev_close = close
+        self.count += 1
+
+        self._since_resync += 1
+        if self.ma_type == 'sma' and self._since_resync >= SMA_RESYNC_EVERY:
+            closes = list(self.window)
+            self.sums = [math.fsum(closes[-p:]) for p in self.periods]
+            self._since_resync = 0
+
+    def _ma_step(self, close):
+        if self.ma_type == 'ema':
+            if self.count == 0:
+                return [close] * len(self.periods), self.sums
+            return [e + a * (close - e) for e, a in zip(self.ema, self.alpha)], self.sums
+
+        sums = []
+        for p, total in zip(self.periods, self.sums):
+            dropped = self.window[-p] if len(self.window) >= p else 0.0
+            sums.append(total + close - dropped)
+        return self.ema, sums
+
+    def _rsi_step(self, close):
+        if self.prev_close is None:
+            return 0.0, 0.0  # ta's first diff is NaN, counted as no move
+        diff = close - self.prev_close
+        alpha = 1.0 / self.rsi_period
+        up, down = max(diff, 0.0), max(-diff, 0.0)
+        return self.avg_up + alpha * (up - self.avg_up), self.avg_down + alpha * (down - self.avg_down)
+
+    # --- reads ---
+    def preview(self, close=None):
+        """(ma values, rsi) including a forming candle at `close`, or the committed state if None."""
+        if close is None:
+            ema, sums, (avg_up, avg_down), count = self.ema, self.sums, (self.avg_up, self.avg_down), self.count
+        else:
+            close = float(close)
+            (ema, sums), (avg_up, avg_down), count = self._ma_step(close), self._rsi_step(close), self.count + 1
+
+        if self.ma_type == 'ema':
+            ma = [e if count >= p else math.nan for e, p in zip(ema, self.periods)]
+        else:
+            ma = [s / p if count >= p else math.nan for s, p in zip(sums, self.periods)]
+
+        if count < self.rsi_period:
+            rsi = math.nan
+        elif avg_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+        return ma, rsi
+
+    def trend(self, close=None):
+        """Same verdict as fully_fanned() on the full series."""
+        (ma1, ma2, ma3), _ = self.preview(close)
+        if ma1 > ma2 > ma3:
+            return 'bullish'
+        elif ma1 < ma2 < ma3:
+            return 'bearish'
+        return 'neutral'
+
+
+# === PER-TIMEFRAME TRACKING ===
+class TimeframeState:
+    """IndicatorState kept in step with a rolling buffer of raw kline rows.
+
+    The last row is treated as forming and only previewed; earlier rows are committed
+    once. If the buffer no longer contains the last committed candle (gap, reseed) the
+    state is rebuilt from the buffer.
+    """
+
+    def __init__(self, ma_type, periods, rsi_period=RSI_PERIOD):
+        self.config = (ma_type, periods, rsi_period)
+        self.state = None
+        self.last_open_time = None
+
+    def sync(self, rows):
+        closed = rows[:-1]
+        start = self._resume_index(closed)
+        if start is None:
+            self.state = IndicatorState(*self.config)
+            start = 0
+        for row in closed[start:]:
+            self.state.close_candle(row[CLOSE])
+        if closed:
+            self.last_open_time = closed[-1][OPEN_TIME]
+
+        forming = float(rows[-1][CLOSE])
+        _, rsi = self.state.preview(forming)
+        return self.state.trend(forming), rsi
+
+    def _resume_index(self, closed):
+        if self.state is None or self.last_open_time is None:
+            return None
+        # New closed candles sit at the end, so scan backwards
+        for i in range(len(closed) - 1, -1, -1):
+            open_time = closed[i][OPEN_TIME]
+            if open_time == self.last_open_time:
+                return i + 1
+            if open_time < self.last_open_time:
+                break
+        return None
+
+
+class SignalTracker:
+    """Per-symbol incremental signals, a drop-in for compute_signals() on kline buffers.
+
+    Pass `tracker.signals` as KlineStream's `on_update`. Note the running EMA/RSI carry
+    the whole history since seeding, while a full recompute restarts at the first row of
+    its window; the two agree until the window first slides and then differ by the
+    (converging) start-up effect only.
+    """
+
+    def __init__(self, ma_config=MA_CONFIG, timeframes=TIMEFRAMES):
+        self.ma_config = ma_config
+        self.timeframes = timeframes
+        self.states = {}  # (symbol, interval) -> TimeframeState
+
+    def signals(self, symbol, buffers):
+        out = {}
+        for interval, prefix in zip(self.timeframes, ('m15', 'h1', 'h4')):
+            state = self.states.get((symbol, interval))
+            if state is None:
+                state = self.states[(symbol, interval)] = TimeframeState(*self.ma_config[interval])
+            out[f'{prefix}_trend'], out[f'{prefix}_rsi'] = state.sync(buffers[interval])
+        return out
+
+    def reset(self, symbol=None):
+        if symbol is None:
+            self.states.clear()
+        else:
+            for key in [k for k in self.states if k[0] == symbol]:
+                del self.states[key]
@@ -0,0 +1,135 @@
+import threading
+import time
+
+# === CONFIG ===
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "8h": 8 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+OPEN_TIME = 0   # index of open time in a raw Binance kline row
+CLOSE_TIME = 6  # index of close time in a raw Binance kline row
+MAX_KLINES_PER_REQUEST = 1500  # Binance's cap on `limit`; deeper windows are paged
+GAP_FILL_LIMIT = 499  # largest catch-up request still in the same weight tier as a 150-candle window
+
+
+# === INCREMENTAL KLINE CACHE ===
+class KlineCache:
+    """Per-(symbol, interval) store of closed candles that only asks Binance for what's new.
+
+    `fetch_klines(params)` must perform the `/fapi/v1/klines` request and return the
+    decoded JSON list. The first call for a key downloads the full window; later calls
+    send `startTime` just after the last closed candle, so a rescan usually pulls the
+    one forming candle plus whatever closed since the previous scan.
+
+    With an `archive` (candle_archive.CandleArchive) closed candles are written through
+    to disk and a fresh process starts from the archived ones, catching up on anything
+    that closed while it was down instead of re-downloading every window.
+
+    Async scanners call `get_async`, which awaits the fetch instead; the window logic
+    is shared, so both kinds of scanner can use the same cache.
+    """
+
+    def __init__(self, fetch_klines, archive=None):
+        self.fetch_klines = fetch_klines
+        self.archive = archive
+        self._closed = {}  # (symbol, interval) -> list of closed raw kline rows
+        self._lock = threading.Lock()
+
+    def get(self, symbol, interval, limit=150):
+        """Return the latest `limit` raw kline rows, the last one being the forming candle."""
+        now_ms = int(time.time() * 1000)
+        closed, params = self._plan(symbol, interval, limit, now_ms)
+        rows = self.fetch_klines(params) if "startTime" in params else self._download(params)
+        return self._merge(symbol, interval, limit, closed, params, rows, now_ms)
+
+    async def get_async(self, symbol, interval, limit=150, fetch_klines=None):
+        """get() for asyncio scanners. `fetch_klines` (default: the constructor's) is awaited."""
+        fetch = fetch_klines or self.fetch_klines
+        now_ms = int(time.time() * 1000)
+        closed, params = self._plan(symbol, interval, limit, now_ms)
+        rows = await fetch(params) if "startTime" in params else await self._download_async(params, fetch)
+        return self._merge(symbol, interval, limit, closed, params, rows, now_ms)
+
+    def _plan(self, symbol, interval, limit, now_ms):
+        """Closed candles to extend and the request that brings them up to date."""
+        with self._lock:
+            closed = list(self._closed.get((symbol, interval), []))
+        if not closed and self.archive is not None:
+            closed = self.archive.rows(symbol, interval, tail=limit)  # warm start after a restart
+
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if len(closed) >= limit - 1:
+            # Candles closed since the last scan, plus the forming one
+            missing = (now_ms - closed[-1][CLOSE_TIME]) // INTERVAL_MS[interval] + 2
+            max_missing = limit if self.archive is None else max(limit, GAP_FILL_LIMIT)
+            if missing < min(max_missing, MAX_KLINES_PER_REQUEST):
+                params["startTime"] = closed[-1][CLOSE_TIME] + 1
+                params["limit"] = missing
+        if "startTime" not in params:
+            closed = []  # cold start or stale window -> full download
+        return closed, params
+
+    def _merge(self, symbol, interval, limit, closed, params, rows, now_ms):
+        if not rows:
+            return rows
+
+        new_closed = []
+        for row in rows:
+            if row[CLOSE_TIME] >= now_ms:
+                break
+            if not closed or row[OPEN_TIME] > closed[-1][OPEN_TIME]:
+                closed.append(row)
+                new_closed.append(row)
+        forming = [row for row in rows if row[CLOSE_TIME] >= now_ms][-1:]
+        closed = closed[-(limit - len(forming)):]
+
+        if self.archive is not None and new_closed:
+            try:
+                self.archive.append(symbol, interval, new_closed, contiguous="startTime" in params)
+            except OSError as e:
+                print(f"Error archiving {symbol} {interval}: {e}")
+
+        with self._lock:
+            self._closed[(symbol, interval)] = closed
+        return closed + forming
+
+    def _download(self, params):
+        """Full window. Deeper than one request allows, it is paged backwards with endTime."""
+        limit = params["limit"]
+        rows = self.fetch_klines(dict(params, limit=min(limit, MAX_KLINES_PER_REQUEST)))
+        while rows and len(rows) < limit:
+            older = self.fetch_klines(dict(params, limit=min(limit - len(rows), MAX_KLINES_PER_REQUEST),
+                                           endTime=rows[0][OPEN_TIME] - 1))
+            if not older:
+                break  # listed more recently than the window reaches
+            rows = older + rows
+        return rows
+
+    async def _download_async(self, params, fetch):
+        limit = params["limit"]
+        rows = await fetch(dict(params, limit=min(limit, MAX_KLINES_PER_REQUEST)))
+        while rows and len(rows) < limit:
+            older = await fetch(dict(params, limit=min(limit - len(rows), MAX_KLINES_PER_REQUEST),
+                                     endTime=rows[0][OPEN_TIME] - 1))
+            if not older:
+                break
+            rows = older + rows
+        return rows
+
+    def clear(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._closed.clear()
+            else:
+                for key in [k for k in self._closed if k[0] == symbol]:
+                    del self._closed[key]
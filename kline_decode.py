@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+# Use a faster JSON parser when one is installed
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    orjson = None
+    loads = json.loads
+
+# === CONFIG ===
+# Positions of the fields we keep in Binance's 12-element kline rows
+KLINE_FIELDS = {
+    'open_time': (0, np.int64),
+    'open': (1, np.float64),
+    'high': (2, np.float64),
+    'low': (3, np.float64),
+    'close': (4, np.float64),
+    'volume': (5, np.float64),
+}
+OHLCV_FIELDS = tuple(KLINE_FIELDS)
+CLASSIFIER_FIELDS = ('open_time', 'close')  # all the MA-fan and RSI rules read
+
+
+def kline_dtype(fields=OHLCV_FIELDS):
+    return np.dtype([(name, KLINE_FIELDS[name][1]) for name in fields])
+
+
+def rows_to_array(rows, fields=OHLCV_FIELDS):
+    """Already-parsed kline rows -> structured array holding only `fields`."""
+    out = np.empty(len(rows), dtype=kline_dtype(fields))
+    for name in fields:
+        idx, kind = KLINE_FIELDS[name]
+        if kind is np.int64:
+            out[name] = [row[idx] for row in rows]
+        else:
+            out[name] = [float(row[idx]) for row in rows]
+    return out
+
+
+def decode_klines(payload, fields=OHLCV_FIELDS):
+    """Raw /fapi/v1/klines body (bytes/str) or parsed list -> structured array.
+
+    Skips the 12-column object DataFrame entirely. Prices arrive as strings, so only
+    the requested columns are converted.
+    """
+    rows = loads(payload) if isinstance(payload, (bytes, bytearray, str)) else payload
+    if isinstance(rows, dict):
+        raise ValueError(f"Binance error {rows.get('code')}: {rows.get('msg')}")
+    return rows_to_array(rows, fields)
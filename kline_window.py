@@ -0,0 +1,48 @@
+import math
+
+# === CONFIG ===
+CONVERGENCE_TOLERANCE = 0.01  # weight the arbitrary seed may still carry in an EMA or Wilder average
+MAX_KLINE_LIMIT = 1500  # Binance's cap on one klines request
+
+
+def warmup(alpha, tolerance=CONVERGENCE_TOLERANCE):
+    """Updates an exponential average needs before its seed weighs less than `tolerance`."""
+    return math.ceil(math.log(tolerance) / math.log(1.0 - alpha))
+
+
+def ma_window(ma_type, period, tolerance=CONVERGENCE_TOLERANCE):
+    """Candles for the last value of one MA: `period` for an SMA, the seed plus warmup for an EMA."""
+    if ma_type == "ema":
+        return max(period, 1 + warmup(2.0 / (period + 1.0), tolerance))
+    return period
+
+
+def rsi_window(period, tolerance=CONVERGENCE_TOLERANCE):
+    """Candles for a converged Wilder RSI: one more than the price changes it averages."""
+    return 1 + max(period, warmup(1.0 / period, tolerance))
+
+
+def kline_windows(ma_config, rsi_period=None, tolerance=CONVERGENCE_TOLERANCE):
+    """Smallest window per timeframe for `ma_config` ({interval: (ma_type, periods)}) and RSI.
+
+    The forming candle is part of every indicator, so it is counted in the window. Klines
+    are charged by `limit` tier, so asking for exactly this many lands each request in
+    the cheapest tier that holds it.
+    """
+    windows = {}
+    for interval, (ma_type, periods) in ma_config.items():
+        need = [ma_window(ma_type, p, tolerance) for p in periods]
+        if rsi_period:
+            need.append(rsi_window(rsi_period, tolerance))
+        windows[interval] = min(max(need), MAX_KLINE_LIMIT)
+    return windows
+
+
+def merge_windows(*windows):
+    """Per-interval maximum of several kline_windows() results."""
+    merged = {}
+    for window in windows:
+        for interval, limit in window.items():
+            merged[interval] = max(merged.get(interval, 0), limit)
+    return merged
+
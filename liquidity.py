@@ -0,0 +1,82 @@
+import threading
+import time
+
+# === CONFIG ===
+MIN_QUOTE_VOLUME = 10_000_000  # 24h USDT turnover
+MIN_TRADE_COUNT = 10_000  # 24h trades
+MIN_ABS_PRICE_CHANGE_PCT = 0.0  # 24h |% change|; raise to skip pairs that aren't moving
+MAX_ABS_FUNDING_RATE = None  # e.g. 0.001 to skip crowded funding; needs the premium index call
+TICKER_TTL = 300  # seconds a fetched ticker snapshot is reused
+
+TICKER_PATH = "/fapi/v1/ticker/24hr"  # all symbols: weight 40
+PREMIUM_PATH = "/fapi/v1/premiumIndex"  # all symbols: weight 10
+
+
+# === FILTER ===
+def by_symbol(rows):
+    """Bulk endpoint response (a list of per-symbol dicts) -> {symbol: row}."""
+    if not isinstance(rows, list) or not rows:
+        raise ValueError(f"Unexpected bulk response: {str(rows)[:100]}")
+    return {row['symbol']: row for row in rows}
+
+
+def liquid_symbols(symbols, tickers, premium=None,
+                   min_quote_volume=MIN_QUOTE_VOLUME, min_trades=MIN_TRADE_COUNT,
+                   min_abs_change=MIN_ABS_PRICE_CHANGE_PCT, max_abs_funding=MAX_ABS_FUNDING_RATE):
+    """`symbols` (order kept) that clear the 24h ticker thresholds.
+
+    Symbols missing from the ticker are dropped. Funding is only checked when a
+    premium-index snapshot is given.
+    """
+    kept = []
+    for symbol in symbols:
+        ticker = tickers.get(symbol)
+        if ticker is None:
+            continue
+        if float(ticker['quoteVolume']) < min_quote_volume:
+            continue
+        if int(ticker['count']) < min_trades:
+            continue
+        if abs(float(ticker['priceChangePercent'])) < min_abs_change:
+            continue
+        if premium is not None and max_abs_funding is not None:
+            rate = premium.get(symbol, {}).get('lastFundingRate')
+            if rate is not None and abs(float(rate)) > max_abs_funding:
+                continue
+        kept.append(symbol)
+    return kept
+
+
+class LiquidityFilter:
+    """Bulk 24h ticker (and optional premium index) prefilter with a short-lived cache.
+
+    `get_json(path)` performs an unparameterized GET against the futures API. One
+    snapshot serves every scan within `ttl`, so the filter costs at most 40 (+10)
+    weight per `ttl` however often the scanner ticks. If the ticker can't be fetched
+    the symbols pass through unfiltered rather than stalling the scan.
+    """
+
+    def __init__(self, get_json, ttl=TICKER_TTL, **thresholds):
+        self.get_json = get_json
+        self.ttl = ttl
+        self.thresholds = thresholds
+        self.use_premium = thresholds.get('max_abs_funding', MAX_ABS_FUNDING_RATE) is not None
+        self._snapshot = None
+        self._fetched = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            if self._snapshot is None or time.time() - self._fetched > self.ttl:
+                tickers = by_symbol(self.get_json(TICKER_PATH))
+                premium = by_symbol(self.get_json(PREMIUM_PATH)) if self.use_premium else None
+                self._snapshot, self._fetched = (tickers, premium), time.time()
+            return self._snapshot
+
+    def apply(self, symbols):
+        try:
+            tickers, premium = self.snapshot()
+        except Exception as e:
+            print(f"Liquidity prefilter unavailable ({e}); scanning all symbols")
+            return list(symbols)
+        return liquid_symbols(symbols, tickers, premium, **self.thresholds)
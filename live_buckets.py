@@ -0,0 +1,86 @@
+import time
+
+# === CONFIG ===
+RENDER_FPS = 4  # live result frames per second at most
+
+
+def bucket_changes(previous, current):
+    """Delta events between two {symbol: bucket} maps, as (symbol, old, new) tuples.
+
+    A bucket of None means the symbol sits in none. Symbols missing from `current`
+    left whatever bucket they had.
+    """
+    events = []
+    for symbol in list(previous) + [s for s in current if s not in previous]:
+        old, new = previous.get(symbol), current.get(symbol)
+        if old != new:
+            events.append((symbol, old, new))
+    return events
+
+
+def buckets_by_symbol(results, categories):
+    """{category: [symbols]} -> {symbol: category}."""
+    return {symbol: category for category in categories for symbol in results.get(category, [])}
+
+
+# === LIVE VIEW ===
+class LiveBuckets:
+    """Bucket membership kept up to date from per-symbol events, drawn at a capped frame rate.
+
+    `update(symbol, bucket)` applies one classification and returns the (symbol, old,
+    new) event if membership changed. `frame()` redraws only the categories touched
+    since the last frame, and at most `fps` times a second, through `render(category,
+    symbols)`. Starting from the previous scan's `initial` buckets, a rescan sends only
+    what actually moved, and the cost per hit stays flat however many symbols qualify.
+    """
+
+    def __init__(self, categories, render, initial=None, fps=RENDER_FPS):
+        self.categories = list(categories)
+        self.render = render
+        self.interval = 1.0 / fps
+        self.members = {category: {} for category in self.categories}  # insertion-ordered sets
+        self.bucket_of = {}
+        self.events = []
+        self._dirty = set(self.categories)  # the first frame draws every column
+        self._next_frame = 0.0
+        for symbol, bucket in (initial or {}).items():
+            if bucket in self.members:
+                self.members[bucket][symbol] = None
+                self.bucket_of[symbol] = bucket
+
+    def update(self, symbol, bucket):
+        old = self.bucket_of.get(symbol)
+        if old == bucket:
+            return None
+        if old is not None:
+            del self.members[old][symbol]
+            self._dirty.add(old)
+        if bucket is not None:
+            self.members[bucket][symbol] = None
+            self.bucket_of[symbol] = bucket
+            self._dirty.add(bucket)
+        else:
+            del self.bucket_of[symbol]
+        event = (symbol, old, bucket)
+        self.events.append(event)
+        return event
+
+    def drop_missing(self, symbols):
+        """Take every symbol not in `symbols` (delisted, filtered out) out of its bucket."""
+        keep = set(symbols)
+        for symbol in [s for s in self.bucket_of if s not in keep]:
+            self.update(symbol, None)
+
+    def frame(self, force=False):
+        """Draw the changed categories if a frame is due. Returns whether one was."""
+        now = time.monotonic()
+        if not force and now < self._next_frame:
+            return False
+        for category in [c for c in self.categories if c in self._dirty]:
+            self.render(category, list(self.members[category]))
+        self._dirty.clear()
+        self._next_frame = now + self.interval
+        return True
+
+    def results(self):
+        return {category: list(self.members[category]) for category in self.categories}
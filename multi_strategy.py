@@ -0,0 +1,55 @@
+import numpy as np
+
+from batch_indicators import pack_closes, last_ema, last_sma, last_rsi, fan_direction
+from strategy_rules import STRATEGIES, compile_rules
+from kline_window import kline_windows, merge_windows
+
+
+# === MULTI-STRATEGY ENGINE ===
+class StrategySet:
+    """Several rule specs evaluated over one fetch and one indicator pass.
+
+    Each distinct (timeframe, MA type, periods) fan and (timeframe, RSI period) series is
+    computed once across all strategies, so a strategy that reuses indicators another
+    one already needs costs only its bucket comparisons.
+    """
+
+    def __init__(self, specs=STRATEGIES):
+        self.rules = {name: compile_rules(spec) for name, spec in specs.items()}
+        self.timeframes = []
+        for rules in self.rules.values():
+            self.timeframes += [tf for tf in rules.timeframes if tf not in self.timeframes]
+        self.fans = sorted({(tf, ma, tuple(periods)) for rules in self.rules.values()
+                            for tf, (ma, periods) in rules.ma_config.items()})
+        self.rsis = sorted({(tf, rules.rsi_period) for rules in self.rules.values() for tf in rules.timeframes})
+        # Candles per timeframe: enough for the most demanding strategy, no more
+        self.windows = merge_windows(*(kline_windows(rules.ma_config, rules.rsi_period) for rules in self.rules.values()))
+
+    def categories(self, name):
+        return self.rules[name].categories
+
+    def indicators(self, frames):
+        """Every fan code and last RSI the strategies need, keyed by feature, each shaped (S,)."""
+        symbols, closes, lengths = pack_closes(frames, self.timeframes)
+        features = {}
+        for tf, ma, periods in self.fans:
+            j = self.timeframes.index(tf)
+            calc = last_ema if ma == "ema" else last_sma
+            features[(tf, ma, periods)] = fan_direction(calc(closes[:, j, :], periods, lengths[:, j]))
+        for tf, period in self.rsis:
+            j = self.timeframes.index(tf)
+            features[(tf, period)] = last_rsi(closes[:, j, :], lengths[:, j], period)
+        return symbols, features
+
+    def evaluate(self, frames):
+        """{strategy: {category: [symbols]}} for `frames` = {symbol: {interval: closes}}."""
+        if not frames:
+            return {name: {category: [] for category in rules.categories} for name, rules in self.rules.items()}
+        symbols, features = self.indicators(frames)
+        out = {}
+        for name, rules in self.rules.items():
+            trend = np.stack([features[(tf, ma, tuple(periods))] for tf, (ma, periods) in rules.ma_config.items()], axis=1)
+            rsi = np.stack([features[(tf, rules.rsi_period)] for tf in rules.timeframes], axis=1)
+            masks = rules.masks(trend, rsi)
+            out[name] = {category: [symbols[i] for i in np.flatnonzero(masks[category])] for category in rules.categories}
+        return out
@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+# === CONFIG ===
+SCHEDULER_TICK = 60  # seconds between scheduler passes
+FULL_SWEEP_INTERVAL = 300  # budget: as many symbol scans as one full sweep per this many seconds
+MAX_STALENESS = 900  # no symbol goes longer than this without a rescan
+PRIORITY_BOOST = 9.0  # a top-scored symbol ages this much faster than a zero-scored one
+RSI_SCALE = 5.0  # RSI points outside the bands per 1/e drop in closeness
+VOL_LOOKBACK = 20  # 15m candles of realized volatility
+VOL_REFERENCE = 0.01  # per-candle log-return std treated as "very volatile"
+VOL_WEIGHT = 0.3  # share of the score that volatility alone can earn
+
+# RSI bands covering both buckets per side (v5 classify_token rules)
+BULLISH_BANDS = ((50, 70), (50, 70), (-math.inf, 70))  # 15m, 1h, 4h
+BEARISH_BANDS = ((30, 50), (30, 50), (30, math.inf))
+
+
+# === SCORING ===
+def band_distance(values, bands):
+    """RSI points outside each band, summed. NaNs count as infinitely far."""
+    total = 0.0
+    for value, (lo, hi) in zip(values, bands):
+        if value is None or value != value:
+            return math.inf
+        total += max(lo - value, 0.0, value - hi)
+    return total
+
+
+def realized_volatility(closes, lookback=VOL_LOOKBACK):
+    closes = np.asarray(closes, dtype=np.float64)[-(lookback + 1):]
+    if len(closes) < 3 or (closes <= 0).any():
+        return 0.0
+    return float(np.std(np.diff(np.log(closes))))
+
+
+def candidate_score(signals, volatility=0.0):
+    """0..1: how close a symbol's last fan/RSI reading was to entering (or sitting in) a bucket."""
+    rsi = (signals.get('m15_rsi'), signals.get('h1_rsi'), signals.get('h4_rsi'))
+    trends = (signals.get('m15_trend'), signals.get('h1_trend'))
+
+    closeness = 0.0
+    for side, bands in (('bullish', BULLISH_BANDS), ('bearish', BEARISH_BANDS)):
+        aligned = sum(trend == side for trend in trends)
+        trend_factor = (0.2, 0.5, 1.0)[aligned]
+        closeness = max(closeness, trend_factor * math.exp(-band_distance(rsi, bands) / RSI_SCALE))
+
+    vol = min(volatility / VOL_REFERENCE, 1.0)
+    return (1 - VOL_WEIGHT) * closeness + VOL_WEIGHT * vol
+
+
+# === SCHEDULER ===
+class PriorityScheduler:
+    """Picks which symbols to rescan on each tick, most likely candidates first.
+
+    Each tick may scan `len(symbols) * tick / FULL_SWEEP_INTERVAL` symbols, the same
+    average request weight as sweeping everything every FULL_SWEEP_INTERVAL. Within that
+    budget symbols are ranked by age x (1 + PRIORITY_BOOST x score), so near-threshold
+    and volatile symbols come round every tick or two while flat ones wait, up to
+    MAX_STALENESS. Symbols never scanned yet are always included.
+    """
+
+    def __init__(self, tick=SCHEDULER_TICK, sweep_interval=FULL_SWEEP_INTERVAL, max_staleness=MAX_STALENESS):
+        self.tick = tick
+        self.sweep_interval = sweep_interval
+        self.max_staleness = max_staleness
+        self.scores = {}  # symbol -> last candidate_score
+        self.last_scanned = {}  # symbol -> epoch seconds
+        self._lock = threading.Lock()
+
+    def budget(self, n_symbols):
+        return max(1, math.ceil(n_symbols * self.tick / self.sweep_interval))
+
+    def urgency(self, symbol, now):
+        with self._lock:
+            last = self.last_scanned.get(symbol)
+            score = self.scores.get(symbol, 0.0)
+        if last is None or now - last >= self.max_staleness:
+            return math.inf
+        return (now - last) * (1 + PRIORITY_BOOST * score)
+
+    def select(self, symbols, now=None):
+        """Symbols to scan this tick, highest urgency first."""
+        now = time.time() if now is None else now
+        ranked = sorted(symbols, key=lambda s: self.urgency(s, now), reverse=True)
+        new = [s for s in ranked if s not in self.last_scanned]
+        rest = [s for s in ranked if s in self.last_scanned]
+        return new + rest[:max(0, self.budget(len(symbols)) - len(new))]
+
+    def record(self, symbol, signals, closes=None, now=None):
+        score = candidate_score(signals, realized_volatility(closes) if closes is not None else 0.0)
+        with self._lock:
+            self.scores[symbol] = score
+            self.last_scanned[symbol] = time.time() if now is None else now
+
+    def forget(self, symbols):
+        with self._lock:
+            for symbol in symbols:
+                self.scores.pop(symbol, None)
+                self.last_scanned.pop(symbol, None)
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+# === CONFIG ===
+WEIGHT_LIMIT_PER_MINUTE = 2400  # Binance futures REQUEST_WEIGHT per IP
+SAFETY_MARGIN = 0.9  # never plan to use more than this share of the limit
+WINDOW_SKEW = 1.0  # seconds of slack around Binance's minute boundary
+DEFAULT_BAN_SECONDS = 120  # 418 without Retry-After
+
+
+# === WEIGHT TABLE ===
+def kline_weight(limit):
+    """Weight of a /fapi/v1/klines call by `limit` tier (default limit is 500)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def request_weight(endpoint, params=None):
+    """Request weight per Binance's USDⓈ-M futures docs."""
+    params = params or {}
+    if endpoint.endswith('klines'):
+        return kline_weight(int(params.get('limit', 500)))
+    if endpoint.endswith('ticker/24hr'):
+        return 1 if 'symbol' in params else 40
+    if endpoint.endswith('premiumIndex'):
+        return 1 if 'symbol' in params else 10
+    if endpoint.endswith('ticker/price'):
+        return 1 if 'symbol' in params else 2
+    return 1  # exchangeInfo, ping, time
+
+
+# === LIMITER ===
+class WeightLimiter:
+    """Process-wide request admission for Binance's per-IP weight limit.
+
+    A token bucket refilled at `capacity / 60` per second paces requests. A per-minute
+    ledger mirrors Binance's fixed window and is the hard cap. It is topped up from the
+    `X-MBX-USED-WEIGHT-1M` header, so weight spent by other processes on the same IP
+    counts too. Callers reserve before sending and sleep for the returned delay.
+    Reservations are handed out in order, so concurrent callers queue fairly.
+    """
+
+    def __init__(self, limit_per_minute=WEIGHT_LIMIT_PER_MINUTE, safety_margin=SAFETY_MARGIN, burst=None):
+        self.capacity = int(limit_per_minute * safety_margin)
+        self.rate = self.capacity / 60.0
+        self.burst = burst or max(self.capacity // 10, 1)
+        self.tokens = float(self.burst)
+        self.blocked_until = 0.0
+        self.total_weight = 0
+        self._refilled = time.monotonic()
+        self._window_used = {}  # minute index -> weight reserved or reported
+        self._lock = threading.Lock()
+
+    def reserve(self, weight=1):
+        """Book `weight` and return how many seconds to wait before sending."""
+        with self._lock:
+            now = time.time()
+            mono = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (mono - self._refilled) * self.rate)
+            self._refilled = mono
+
+            self.tokens -= weight
+            send_at = max(now, self.blocked_until, now - self.tokens / self.rate)
+
+            window = int(send_at // 60)
+            while self._window_used.get(window, 0) + weight > self.capacity:
+                window += 1
+                send_at = max(send_at, window * 60 + WINDOW_SKEW)
+            self._window_used[window] = self._window_used.get(window, 0) + weight
+            self.total_weight += weight
+
+            for old in [w for w in self._window_used if w < int(now // 60)]:
+                del self._window_used[old]
+            return send_at - now
+
+    def acquire(self, weight=1):
+        time.sleep(self.reserve(weight))
+
+    async def acquire_async(self, weight=1):
+        await asyncio.sleep(self.reserve(weight))
+
+    def update_from_headers(self, headers):
+        """Sync the current window with the weight Binance reports for this IP."""
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('x-mbx-used-weight-1m')
+        if used is None:
+            return
+        with self._lock:
+            window = int(time.time() // 60)
+            self._window_used[window] = max(self._window_used.get(window, 0), int(used))
+
+    def backoff(self, seconds=None):
+        """Stop admitting requests after a 429/418, until Retry-After or the next window."""
+        with self._lock:
+            now = time.time()
+            until = now + seconds if seconds else (int(now // 60) + 1) * 60 + WINDOW_SKEW
+            self.blocked_until = max(self.blocked_until, until)
+
+    def used_weight(self):
+        with self._lock:
+            return self._window_used.get(int(time.time() // 60), 0)
+
+
+# Shared by every scanner, session and thread in this process
+limiter = WeightLimiter()
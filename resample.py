@@ -0,0 +1,43 @@
+import numpy as np
+
+from kline_cache import INTERVAL_MS
+from kline_decode import kline_dtype, OHLCV_FIELDS
+
+
+def resample(candles, interval, source_interval="15m"):
+    """Aggregate a typed OHLCV series (kline_decode structured array) into `interval` candles.
+
+    Buckets follow Binance's boundaries: open times on UTC multiples of the interval. A
+    leading bucket the series only partly covers is dropped, since its open/high/low
+    would be wrong. The last bucket is kept even if partial; it is the forming candle
+    and matches what Binance reports for it at the same instant.
+    """
+    step = INTERVAL_MS[interval]
+    if step % INTERVAL_MS[source_interval]:
+        raise ValueError(f"Can't build {interval} candles from {source_interval}")
+
+    open_time = candles['open_time']
+    bucket = open_time // step * step
+    if len(candles) and open_time[0] != bucket[0]:
+        keep = bucket != bucket[0]
+        candles, bucket = candles[keep], bucket[keep]
+
+    if not len(candles):
+        return np.empty(0, dtype=kline_dtype(OHLCV_FIELDS))
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    out = np.empty(len(starts), dtype=kline_dtype(OHLCV_FIELDS))
+    out['open_time'] = bucket[starts]
+    out['open'] = candles['open'][starts]
+    out['high'] = np.maximum.reduceat(candles['high'], starts)
+    out['low'] = np.minimum.reduceat(candles['low'], starts)
+    out['close'] = candles['close'][ends]
+    out['volume'] = np.add.reduceat(candles['volume'], starts)
+    return out
+
+
+def source_depth(limit, interval, source_interval="15m"):
+    """Source candles needed for `limit` resampled ones, plus a bucket of slack for alignment."""
+    ratio = INTERVAL_MS[interval] // INTERVAL_MS[source_interval]
+    return (limit + 1) * ratio
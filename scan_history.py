@@ -0,0 +1,200 @@
+import math
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from batch_indicators import classify_signals, CATEGORIES, SIGNAL_KEYS
+from strategy_rules import TREND_CODES
+
+# === CONFIG ===
+HISTORY_DB = "scan_history.sqlite"
+HISTORY_DAYS = 30  # rows older than this are pruned (a symbol's latest row is always kept)
+PRUNE_INTERVAL = 3600  # seconds between prunes, run from record()
+RSI_SCALE = 100  # RSI stored as an integer number of hundredths
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (id INTEGER PRIMARY KEY, scan_time REAL NOT NULL, duration REAL, symbols INTEGER);
+CREATE INDEX IF NOT EXISTS scans_by_time ON scans (scan_time);
+CREATE TABLE IF NOT EXISTS symbols (id INTEGER PRIMARY KEY, symbol TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS signals (
+    symbol_id INTEGER NOT NULL, scan_id INTEGER NOT NULL, bucket INTEGER NOT NULL, trends INTEGER,
+    m15_rsi INTEGER, h1_rsi INTEGER, h4_rsi INTEGER,
+    PRIMARY KEY (symbol_id, scan_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_by_scan ON signals (scan_id, bucket);
+"""
+
+TREND_NAMES = {code: name for name, code in TREND_CODES.items()}
+DELISTED = -1  # bucket of the row written when a symbol leaves the exchange's universe
+
+
+# === ENCODING ===
+def encode_trends(signals):
+    """Three fan verdicts (-1/0/1 each) packed into one small integer, base 3."""
+    code = 0
+    for key in reversed(SIGNAL_KEYS):
+        code = code * 3 + TREND_CODES.get(signals[f'{key}_trend'], 0) + 1
+    return code
+
+
+def decode_trends(code):
+    out = {}
+    for key in SIGNAL_KEYS:
+        code, digit = divmod(code, 3)
+        out[f'{key}_trend'] = TREND_NAMES[digit - 1]
+    return out
+
+
+def encode_rsi(value):
+    return None if value is None or math.isnan(value) else int(round(value * RSI_SCALE))
+
+
+def decode_rsi(value):
+    return math.nan if value is None else value / RSI_SCALE
+
+
+def bucket_name(code):
+    return CATEGORIES[code - 1] if code > 0 else None
+
+
+# === HISTORY STORE ===
+class ScanHistory:
+    """Append-only history of every scan's buckets and indicator values in one SQLite file.
+
+    Each scan adds a row to `scans`. A symbol only gets a new `signals` row when its
+    encoded bucket, fans or RSIs differ from its previous row, so a symbol's state at
+    any scan is its latest row at or before it. A symbol missing from one scan (a failed
+    fetch, a dip under the liquidity floor) keeps that state; only symbols passed as
+    `delisted` get a closing DELISTED row. Buckets are stored under the default
+    filters (momentum and RSI on) as 1 + CATEGORIES index, 0 for none. Rows are keyed
+    (symbol, scan), so per-symbol history and streaks are index range reads.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+        with closing(self._connect()) as db:
+            db.executescript(SCHEMA)
+            self._symbol_ids = dict(db.execute("SELECT symbol, id FROM symbols"))
+            # Latest encoded row per symbol, to write only what changed
+            self._last = {symbol_id: tuple(row) for symbol_id, *row in db.execute(
+                "SELECT symbol_id, bucket, trends, m15_rsi, h1_rsi, h4_rsi FROM signals "
+                "WHERE (symbol_id, scan_id) IN (SELECT symbol_id, MAX(scan_id) FROM signals GROUP BY symbol_id)")
+                if row[0] != DELISTED}
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        db.execute("PRAGMA journal_mode = WAL")  # pages read while the scanner appends
+        return db
+
+    # --- writing ---
+    def record(self, results, scan_time=None, duration=None, delisted=()):
+        """Append one scan of {symbol: signals}. Returns the number of signal rows written.
+
+        `delisted` names symbols that left the universe (SymbolUniverse.last_diff); they
+        are closed with a DELISTED row. Other symbols absent from `results` are untouched.
+        """
+        scan_time = time.time() if scan_time is None else scan_time
+        buckets = classify_signals(results)
+        code_of = {symbol: k + 1 for k, category in enumerate(CATEGORIES) for symbol in buckets[category]}
+
+        with self._lock:
+            # Caches only take the scan's changes once its transaction has committed
+            new_ids, changed, closed = {}, {}, []
+            with closing(self._connect()) as db, db:
+                scan_id = db.execute("INSERT INTO scans (scan_time, duration, symbols) VALUES (?, ?, ?)",
+                                     (scan_time, duration, len(results))).lastrowid
+                rows = []
+                for symbol, signals in results.items():
+                    symbol_id = self._symbol_id(db, symbol, new_ids)
+                    encoded = (code_of.get(symbol, 0), encode_trends(signals),
+                               *(encode_rsi(signals[f'{key}_rsi']) for key in SIGNAL_KEYS))
+                    if self._last.get(symbol_id) != encoded:
+                        rows.append((symbol_id, scan_id) + encoded)
+                        changed[symbol_id] = encoded
+                for symbol in delisted:
+                    symbol_id = self._symbol_ids.get(symbol)
+                    if symbol not in results and symbol_id in self._last:
+                        rows.append((symbol_id, scan_id, DELISTED, None, None, None, None))
+                        closed.append(symbol_id)
+                db.executemany("INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._symbol_ids.update(new_ids)
+            self._last.update(changed)
+            for symbol_id in closed:
+                del self._last[symbol_id]
+
+        if scan_time >= self._next_prune:
+            self._next_prune = scan_time + PRUNE_INTERVAL
+            self.prune()
+        return len(rows)
+
+    def _symbol_id(self, db, symbol, new_ids):
+        if symbol in self._symbol_ids:
+            return self._symbol_ids[symbol]
+        if symbol not in new_ids:
+            db.execute("INSERT OR IGNORE INTO symbols (symbol) VALUES (?)", (symbol,))
+            new_ids[symbol] = db.execute("SELECT id FROM symbols WHERE symbol = ?", (symbol,)).fetchone()[0]
+        return new_ids[symbol]
+
+    def prune(self, days=HISTORY_DAYS):
+        """Drop scans older than `days`, keeping each symbol's latest row so its state survives."""
+        cutoff = time.time() - days * 86400
+        with self._lock, closing(self._connect()) as db, db:
+            old = db.execute("SELECT MAX(id) FROM scans WHERE scan_time < ?", (cutoff,)).fetchone()[0]
+            if old is None:
+                return
+            db.execute("DELETE FROM signals WHERE scan_id <= ? AND scan_id < "
+                       "(SELECT MAX(scan_id) FROM signals AS latest WHERE latest.symbol_id = signals.symbol_id)", (old,))
+            db.execute("DELETE FROM scans WHERE id <= ? AND id NOT IN (SELECT scan_id FROM signals)", (old,))
+
+    # --- queries ---
+    def symbol_history(self, symbol, since=None):
+        """Rows of `symbol` (each the state from its scan on), oldest first, as dicts."""
+        since = 0 if since is None else since
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT scans.scan_time, bucket, trends, m15_rsi, h1_rsi, h4_rsi FROM signals "
+                "JOIN scans ON scans.id = signals.scan_id JOIN symbols ON symbols.id = signals.symbol_id "
+                "WHERE symbols.symbol = ? AND scans.scan_time >= ? ORDER BY signals.scan_id", (symbol, since)).fetchall()
+        out = []
+        for scan_time, bucket, trends, *rsi in rows:
+            row = {'scan_time': scan_time, 'bucket': bucket_name(bucket) if bucket != DELISTED else 'delisted'}
+            if trends is not None:
+                row.update(decode_trends(trends))
+                row.update({f'{key}_rsi': decode_rsi(value) for key, value in zip(SIGNAL_KEYS, rsi)})
+            out.append(row)
+        return out
+
+    def streak(self, symbol):
+        """(bucket, since scan_time) of `symbol`'s current stay in its bucket, or None if unknown."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT s.bucket, (SELECT scans.scan_time FROM signals AS f JOIN scans ON scans.id = f.scan_id "
+                "   WHERE f.symbol_id = s.symbol_id AND f.scan_id > COALESCE((SELECT MAX(c.scan_id) FROM signals AS c "
+                "       WHERE c.symbol_id = s.symbol_id AND c.bucket != s.bucket), 0) ORDER BY f.scan_id LIMIT 1) "
+                "FROM signals AS s JOIN symbols ON symbols.id = s.symbol_id WHERE symbols.symbol = ? "
+                "ORDER BY s.scan_id DESC LIMIT 1", (symbol,)).fetchone()
+        if row is None or row[0] == DELISTED:
+            return None
+        return bucket_name(row[0]), row[1]
+
+    def bucket_streaks(self, category):
+        """[(symbol, since scan_time)] for every symbol now in `category`, longest-standing first."""
+        code = CATEGORIES.index(category) + 1
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT symbols.symbol, (SELECT scans.scan_time FROM signals AS f JOIN scans ON scans.id = f.scan_id "
+                "   WHERE f.symbol_id = s.symbol_id AND f.scan_id > COALESCE((SELECT MAX(c.scan_id) FROM signals AS c "
+                "       WHERE c.symbol_id = s.symbol_id AND c.bucket != ?), 0) ORDER BY f.scan_id LIMIT 1) AS since "
+                "FROM signals AS s JOIN symbols ON symbols.id = s.symbol_id "
+                "WHERE s.bucket = ? AND s.scan_id = (SELECT MAX(scan_id) FROM signals AS l WHERE l.symbol_id = s.symbol_id) "
+                "ORDER BY since", (code, code)).fetchall()
+        return rows
+
+    def scans(self, since=None):
+        """[(scan_time, duration, symbols)] of scans from `since` on."""
+        with closing(self._connect()) as db:
+            return db.execute("SELECT scan_time, duration, symbols FROM scans WHERE scan_time >= ? ORDER BY id",
+                              (0 if since is None else since,)).fetchall()
@@ -0,0 +1,230 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from rate_limiter import limiter
+
+# === CONFIG ===
+METRICS_HOST = "127.0.0.1"  # local only; scrape through a proxy if it must be reachable
+METRICS_PORT = 9108
+METRICS_PREFIX = "trendscan"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def endpoint_name(url):
+    """'https://fapi.binance.com/fapi/v1/klines' -> 'klines', a low-cardinality label."""
+    return url.split('?', 1)[0].rsplit('/fapi/v1/', 1)[-1]
+
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+# === METRIC TYPES ===
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self.values = {}  # sorted label items -> value
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            return [f"{self.name}{_labels(key)} {value}" for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self.values = {}  # sorted label items -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def lines(self):
+        out = []
+        with self._lock:
+            for key, counts in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    out.append(f"{self.name}_bucket{_labels(key, [('le', bound)])} {cumulative}")
+                out.append(f"{self.name}_sum{_labels(key)} {counts[-1]}")
+                out.append(f"{self.name}_count{_labels(key)} {cumulative}")
+        return out
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, read):
+        self.name, self.help = name, help_text
+        self.read = read  # sampled at scrape time
+
+    def lines(self):
+        return [f"{self.name} {self.read()}"]
+
+
+# === SCAN METRICS ===
+class ScanMetrics:
+    """Stage timings and Binance request counters for one process, plus a per-scan summary.
+
+    `stage(name)` times a block into a histogram and into the current scan's totals.
+    Stages overlap in the async scanners, so their totals can add up to more than the
+    scan's wall time. `begin_scan()` / `end_scan()` bracket a scan; concurrent scans in
+    one process (several sessions of a per-session scanner) share the same totals.
+    """
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.stage_seconds = Histogram(f"{prefix}_stage_seconds", "Time spent per scan stage")
+        self.scan_seconds = Histogram(f"{prefix}_scan_seconds", "Wall time of complete scans")
+        self.requests = Counter(f"{prefix}_requests_total", "Binance responses by endpoint and status")
+        self.retries = Counter(f"{prefix}_retries_total", "Requests retried, by endpoint and reason")
+        self.rate_limited = Counter(f"{prefix}_rate_limited_total", "HTTP 429 responses")
+        self.banned = Counter(f"{prefix}_ip_banned_total", "HTTP 418 responses")
+        self.weight = Counter(f"{prefix}_request_weight_total", "Request weight spent, by endpoint")
+        self.weight_used = Gauge(f"{prefix}_weight_used_1m", "Weight used in the current minute", limiter.used_weight)
+        self.metrics = [self.stage_seconds, self.scan_seconds, self.requests, self.retries,
+                        self.rate_limited, self.banned, self.weight, self.weight_used]
+        self.last_summary = []
+        self._scan = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- recording ---
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - started)
+
+    def observe_stage(self, name, seconds):
+        self.stage_seconds.observe(seconds, stage=name)
+        with self._lock:
+            if self._scan is not None:
+                calls, total, peak = self._scan['stages'].get(name, (0, 0.0, 0.0))
+                self._scan['stages'][name] = (calls + 1, total + seconds, max(peak, seconds))
+
+    def count_request(self, url, status):
+        endpoint = endpoint_name(url)
+        self.requests.inc(endpoint=endpoint, status=status)
+        if status == 429:
+            self.rate_limited.inc()
+        elif status == 418:
+            self.banned.inc()
+        self._count_in_scan('requests', 1)
+        if status in (429, 418):
+            self._count_in_scan(str(status), 1)
+
+    def count_retry(self, url, reason):
+        self.retries.inc(endpoint=endpoint_name(url), reason=reason)
+        self._count_in_scan('retries', 1)
+
+    def count_weight(self, url, weight):
+        self.weight.inc(weight, endpoint=endpoint_name(url))
+        self._count_in_scan('weight', weight)
+
+    def _count_in_scan(self, name, amount):
+        with self._lock:
+            if self._scan is not None:
+                self._scan['counts'][name] = self._scan['counts'].get(name, 0) + amount
+
+    # --- per-scan summary ---
+    def begin_scan(self):
+        with self._lock:
+            self._scan = {'started': time.perf_counter(), 'stages': {}, 'counts': {}}
+
+    def end_scan(self):
+        """Close the scan and return its summary rows (also kept as `last_summary`)."""
+        with self._lock:
+            scan, self._scan = self._scan, None
+        if scan is None:
+            return self.last_summary
+        wall = time.perf_counter() - scan['started']
+        self.scan_seconds.observe(wall)
+
+        rows = []
+        for name, (calls, total, peak) in sorted(scan['stages'].items(), key=lambda item: -item[1][1]):
+            rows.append({
+                'stage': name,
+                'count': calls,
+                'total_s': round(total, 3),
+                'mean_ms': round(total / calls * 1000, 2),
+                'max_ms': round(peak * 1000, 2),
+                'share_of_scan': f"{total / wall:.0%}" if wall else "-",
+            })
+        rows.append({'stage': 'scan (wall)', 'count': 1, 'total_s': round(wall, 3),
+                     'mean_ms': round(wall * 1000, 2), 'max_ms': round(wall * 1000, 2), 'share_of_scan': "100%"})
+        for name in ('requests', 'weight', 'retries', '429', '418'):
+            rows.append({'stage': name, 'count': scan['counts'].get(name, 0)})
+        self.last_summary = rows
+        return rows
+
+    # --- exposition ---
+    def render(self):
+        """All metrics in Prometheus' text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host=METRICS_HOST):
+        """Serve /metrics on a daemon thread. Safe to call on every rerun; starts once."""
+        with self._lock:
+            if self._server is not None:
+                return self._server.server_address[1]
+            try:
+                self._server = ThreadingHTTPServer((host, port), self._handler())
+            except OSError as e:
+                print(f"Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+    def _handler(self):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+# Shared by every scanner, session and thread in this process
+metrics = ScanMetrics()
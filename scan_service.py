@@ -0,0 +1,83 @@
+import threading
+import time
+
+# === CONFIG ===
+SCAN_INTERVAL = 300  # seconds; scans start on multiples of this (5-minute marks)
+
+
+def seconds_to_next_run(interval=SCAN_INTERVAL, now=None):
+    """Seconds until the next clock-aligned multiple of `interval`."""
+    now = time.time() if now is None else now
+    return interval - (now % interval) or interval
+
+
+# === BACKGROUND SCANNER ===
+class ScanService:
+    """Runs the market scan on its own thread and publishes the latest snapshot.
+
+    `scan_fn(service)` performs one full pass and returns `{symbol: signals}`; it may call
+    `service.report_progress()` as it goes. Pages only call `latest()` / `progress`, which
+    never wait on a scan, so the number of viewers doesn't change the API load.
+
+    Scans start on clock multiples of `interval`, or, given `schedule`, after however
+    many seconds `schedule()` returns (e.g. just after the next candle close).
+    `on_scan(snapshot)` is called on the service thread after every successful scan.
+    """
+
+    def __init__(self, scan_fn, interval=SCAN_INTERVAL, schedule=None, on_scan=None):
+        self.scan_fn = scan_fn
+        self.interval = interval
+        self.schedule = schedule
+        self.on_scan = on_scan
+        self.progress = {'running': False, 'done': 0, 'total': 0, 'symbol': ''}
+        self._snapshot = {'results': {}, 'scan_time': None, 'duration': None, 'error': None}
+        self._trigger = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="scan-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def latest(self):
+        return self._snapshot
+
+    def trigger(self):
+        """Start the next scan now instead of waiting for the next clock mark."""
+        self._trigger.set()
+
+    def report_progress(self, done, total, symbol=''):
+        self.progress = {'running': True, 'done': done, 'total': total, 'symbol': symbol}
+
+    def _run(self):
+        while True:
+            self.scan_once()
+            wait = self.schedule() if self.schedule else seconds_to_next_run(self.interval)
+            self._trigger.wait(timeout=wait)
+            self._trigger.clear()
+
+    def scan_once(self):
+        started = time.time()
+        self.progress = {'running': True, 'done': 0, 'total': 0, 'symbol': ''}
+        try:
+            results = self.scan_fn(self)
+        except Exception as e:
+            print(f"Scan failed: {e}")
+            self._snapshot = dict(self._snapshot, error=str(e))
+        else:
+            # Swap in a new dict so readers always see a complete snapshot
+            self._snapshot = {
+                'results': results,
+                'scan_time': time.time(),
+                'duration': time.time() - started,
+                'error': None,
+            }
+            if self.on_scan is not None:
+                try:
+                    self.on_scan(self._snapshot)
+                except Exception as e:
+                    print(f"Scan callback failed: {e}")
+        finally:
+            self.progress = dict(self.progress, running=False)
+        return self._snapshot
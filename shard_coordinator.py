@@ -0,0 +1,190 @@
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+
+# === CONFIG ===
+SHARD_COUNT = 32  # fixed hash buckets of the symbol universe; nodes hold several each
+LEASE_SECONDS = 60  # a node that stops heartbeating loses its shards (and leadership) after this
+HEARTBEAT_INTERVAL = 15  # seconds between lease renewals
+RESULT_MAX_AGE = 900  # results older than this drop out of the merged snapshot
+MIN_SCAN_INTERVAL = 60  # floor for the per-node scan interval however many nodes join
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, heartbeat REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (shard INTEGER PRIMARY KEY, node_id TEXT NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS results (
+    symbol TEXT PRIMARY KEY, shard INTEGER NOT NULL, signals TEXT NOT NULL,
+    node_id TEXT NOT NULL, updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leader (id INTEGER PRIMARY KEY CHECK (id = 0), node_id TEXT NOT NULL, expires REAL NOT NULL);
+"""
+
+
+def shard_of(symbol, shard_count=SHARD_COUNT):
+    """Stable across processes and machines, unlike hash()."""
+    return zlib.crc32(symbol.encode()) % shard_count
+
+
+def default_node_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# === COORDINATOR ===
+class SQLiteCoordinator:
+    """Shard leases, leader election and merged results in one SQLite file.
+
+    Every node scans only the symbols whose `shard_of` it holds a lease on. Leases are
+    renewed by a heartbeat thread, so a node that dies loses its shards after
+    `lease_seconds` and the others claim them on their next pass. On each claim a node
+    takes its fair share, ceil(shards / live nodes), and hands back any surplus, so
+    joining nodes pick up work within a pass. The leader (a lease of its own) prunes
+    departed nodes and results nobody refreshes any more.
+
+    The file must be lockable by every node: a volume shared between containers, or a
+    network filesystem with working locks. Another backend (Redis, etcd, ...) only needs
+    the same public methods.
+    """
+
+    def __init__(self, path, node_id=None, shard_count=SHARD_COUNT, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.node_id = node_id or default_node_id()
+        self.shard_count = shard_count
+        self.lease_seconds = lease_seconds
+        self.shards = []
+        self._thread = None
+        with closing(self._connect()) as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA busy_timeout = 30000")
+        return db
+
+    def _transaction(self, work):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            result = work(db, time.time())
+            db.execute("COMMIT")
+            return result
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def shard_of(self, symbol):
+        return shard_of(symbol, self.shard_count)
+
+    # --- membership ---
+    def start(self):
+        """Register this node and keep its heartbeat and leases alive on a daemon thread."""
+        self.heartbeat()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shard-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                print(f"Shard heartbeat failed: {e}")
+
+    def heartbeat(self):
+        def work(db, now):
+            db.execute("INSERT INTO nodes VALUES (?, ?) ON CONFLICT(node_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                       (self.node_id, now))
+            db.execute("UPDATE leases SET expires = ? WHERE node_id = ? AND expires > ?",
+                       (now + self.lease_seconds, self.node_id, now))
+            db.execute("UPDATE leader SET expires = ? WHERE node_id = ? AND expires > ?",
+                       (now + self.lease_seconds, self.node_id, now))
+        self._transaction(work)
+
+    def live_nodes(self):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT node_id FROM nodes WHERE heartbeat > ?",
+                              (time.time() - self.lease_seconds,)).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def scan_interval(self, base_interval):
+        """`base_interval` split across the live nodes: each carries 1/N of the weight."""
+        return max(MIN_SCAN_INTERVAL, int(base_interval / max(1, len(self.live_nodes()))))
+
+    # --- shards ---
+    def claim_shards(self):
+        """Renew, top up or trim this node's leases to its fair share. Returns the shard ids."""
+        def work(db, now):
+            db.execute("INSERT INTO nodes VALUES (?, ?) ON CONFLICT(node_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                       (self.node_id, now))
+            nodes = db.execute("SELECT COUNT(*) FROM nodes WHERE heartbeat > ?", (now - self.lease_seconds,)).fetchone()[0]
+            target = math.ceil(self.shard_count / max(1, nodes))
+            held = {shard: (node, expires) for shard, node, expires in db.execute("SELECT shard, node_id, expires FROM leases")}
+
+            mine = sorted(s for s, (node, expires) in held.items() if node == self.node_id and expires > now)
+            for shard in mine[target:]:
+                db.execute("DELETE FROM leases WHERE shard = ?", (shard,))  # surplus goes back to the pool
+            mine = mine[:target]
+            free = [s for s in range(self.shard_count) if s not in held or held[s][1] <= now]
+            mine += free[:target - len(mine)]
+
+            db.executemany("INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(shard) DO UPDATE "
+                           "SET node_id = excluded.node_id, expires = excluded.expires",
+                           [(shard, self.node_id, now + self.lease_seconds) for shard in mine])
+            return sorted(mine)
+
+        self.shards = self._transaction(work)
+        return self.shards
+
+    # --- results ---
+    def publish(self, results, shards=None):
+        """Store this pass's {symbol: signals} for `shards`; symbols of those shards not in it are dropped."""
+        shards = self.shards if shards is None else shards
+
+        def work(db, now):
+            placeholders = ",".join("?" * len(shards))
+            if shards:
+                stale = [row[0] for row in db.execute(
+                    f"SELECT symbol FROM results WHERE shard IN ({placeholders})", list(shards)) if row[0] not in results]
+                db.executemany("DELETE FROM results WHERE symbol = ?", [(symbol,) for symbol in stale])
+            db.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?) ON CONFLICT(symbol) DO UPDATE SET shard = excluded.shard, "
+                "signals = excluded.signals, node_id = excluded.node_id, updated = excluded.updated",
+                [(symbol, self.shard_of(symbol), json.dumps(signals), self.node_id, now)
+                 for symbol, signals in results.items()])
+        self._transaction(work)
+
+    def snapshot(self, max_age=RESULT_MAX_AGE):
+        """Merged {symbol: signals} from every node, leaving out results nobody refreshed in `max_age`."""
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT symbol, signals FROM results WHERE updated > ?", (time.time() - max_age,)).fetchall()
+        return {symbol: json.loads(signals) for symbol, signals in rows}
+
+    # --- leadership ---
+    def elect_leader(self):
+        """Take or keep the leader lease if it's free or ours. Returns whether this node leads."""
+        def work(db, now):
+            row = db.execute("SELECT node_id, expires FROM leader WHERE id = 0").fetchone()
+            if row is None or row[0] == self.node_id or row[1] <= now:
+                db.execute("INSERT INTO leader VALUES (0, ?, ?) ON CONFLICT(id) DO UPDATE "
+                           "SET node_id = excluded.node_id, expires = excluded.expires",
+                           (self.node_id, now + self.lease_seconds))
+                return True
+            return False
+        return self._transaction(work)
+
+    def housekeeping(self, max_age=RESULT_MAX_AGE):
+        """Leader duty: forget long-gone nodes, their leases and results nobody refreshes."""
+        def work(db, now):
+            db.execute("DELETE FROM nodes WHERE heartbeat <= ?", (now - 10 * self.lease_seconds,))
+            db.execute("DELETE FROM leases WHERE expires <= ?", (now,))
+            db.execute("DELETE FROM results WHERE updated <= ?", (now - max_age,))
+        self._transaction(work)
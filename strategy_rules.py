@@ -0,0 +1,166 @@
+import operator
+
+import numpy as np
+import yaml
+
+# === RULE SPECS ===
+# A spec names the MA fan per timeframe and, per bucket, the fan direction and RSI bands a
+# symbol needs. Buckets are tried in order and the first match wins, like the if/elif
+# chain in classify_token. An RSI bound is [low, high] (inclusive) or a dict of
+# min/max (inclusive) and above/below (strict). `rsi_optional` buckets stand on their
+# fan alone when the RSI filter is off; the others are empty then.
+V5_RULES = {
+    'name': 'v5',
+    'timeframes': {
+        '15m': {'ma': 'ema', 'periods': [21, 55, 100]},
+        '1h': {'ma': 'sma', 'periods': [7, 30, 100]},
+        '4h': {'ma': 'sma', 'periods': [7, 30, 100]},
+    },
+    'rsi_period': 14,
+    'buckets': {
+        'bullish_in_range': {
+            'trend': {'15m': 'bullish', '1h': 'bullish'},
+            'rsi': {'15m': [50, 60], '1h': [50, 60], '4h': [50, 60]},
+            'rsi_optional': True,
+        },
+        'bullish_range_break': {
+            'trend': {'15m': 'bullish', '1h': 'bullish'},
+            'rsi': {'15m': [60, 70], '1h': [60, 70], '4h': {'below': 70}},
+        },
+        'bearish_in_range': {
+            'trend': {'15m': 'bearish', '1h': 'bearish'},
+            'rsi': {'15m': [40, 50], '1h': [40, 50], '4h': [40, 50]},
+            'rsi_optional': True,
+        },
+        'bearish_range_break': {
+            'trend': {'15m': 'bearish', '1h': 'bearish'},
+            'rsi': {'15m': [30, 40], '1h': [30, 40], '4h': {'above': 30}},
+        },
+    },
+}
+
+# v2 and the speed scanners: tighter 4h caps on the range breaks
+V2_RULES = {
+    **V5_RULES,
+    'name': 'v2',
+    'buckets': {
+        **V5_RULES['buckets'],
+        'bullish_range_break': {**V5_RULES['buckets']['bullish_range_break'],
+                                'rsi': {'15m': [60, 70], '1h': [60, 70], '4h': {'below': 65}}},
+        'bearish_range_break': {**V5_RULES['buckets']['bearish_range_break'],
+                                'rsi': {'15m': [30, 40], '1h': [30, 40], '4h': {'above': 45}}},
+    },
+}
+
+# v1: 15m and 1h fans agree; v1-h4: the 4h fan too. No RSI, so the RSI filter is moot
+V1_RULES = {
+    'name': 'v1',
+    'timeframes': V5_RULES['timeframes'],
+    'buckets': {
+        'bullish': {'trend': {'15m': 'bullish', '1h': 'bullish'}, 'rsi_optional': True},
+        'bearish': {'trend': {'15m': 'bearish', '1h': 'bearish'}, 'rsi_optional': True},
+    },
+}
+
+V1_H4_RULES = {
+    **V1_RULES,
+    'name': 'v1-h4',
+    'buckets': {
+        'bullish': {'trend': {'15m': 'bullish', '1h': 'bullish', '4h': 'bullish'}, 'rsi_optional': True},
+        'bearish': {'trend': {'15m': 'bearish', '1h': 'bearish', '4h': 'bearish'}, 'rsi_optional': True},
+    },
+}
+
+# The v5 RSI bands with no fan requirement. The v3-v5 momentum toggle can't express this:
+# switched off, it turns every trend neutral and no bucket matches
+MOMENTUM_OFF_RULES = {
+    **V5_RULES,
+    'name': 'momentum-off',
+    'buckets': {category: {key: value for key, value in rule.items() if key != 'trend'}
+                for category, rule in V5_RULES['buckets'].items()},
+}
+
+# Strategies the multi-strategy scanner runs, by display name
+STRATEGIES = {
+    'v1': V1_RULES,
+    'v1-h4': V1_H4_RULES,
+    'rsi': V2_RULES,
+    'v5': V5_RULES,
+    'momentum-off': MOMENTUM_OFF_RULES,
+}
+
+TREND_CODES = {'bullish': 1, 'neutral': 0, 'bearish': -1}
+BOUND_OPS = {'min': operator.ge, 'max': operator.le, 'above': operator.gt, 'below': operator.lt}
+
+
+# === COMPILER ===
+def _bounds(bound):
+    if isinstance(bound, (list, tuple)):
+        low, high = bound
+        return [(operator.ge, float(low)), (operator.le, float(high))]
+    unknown = set(bound) - set(BOUND_OPS)
+    if unknown:
+        raise ValueError(f"Unknown RSI bound {sorted(unknown)}; use {sorted(BOUND_OPS)} or [low, high]")
+    return [(BOUND_OPS[key], float(value)) for key, value in bound.items()]
+
+
+class CompiledRules:
+    """A rule spec turned into column comparisons over (symbols x timeframes) arrays.
+
+    `trend` holds fan codes (TREND_CODES) and `rsi` the last RSI, one column per
+    timeframe in the spec's order. Compiling resolves names to columns and bounds to
+    operators once, so `masks()` is a handful of whole-array comparisons per bucket.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get('name', 'rules')
+        self.timeframes = list(spec['timeframes'])
+        self.ma_config = {tf: (cfg['ma'], list(cfg['periods'])) for tf, cfg in spec['timeframes'].items()}
+        self.rsi_period = spec.get('rsi_period', 14)
+        self.categories = list(spec['buckets'])
+        self.buckets = [self._compile_bucket(category, rule) for category, rule in spec['buckets'].items()]
+
+    def _column(self, category, tf):
+        if tf not in self.timeframes:
+            raise ValueError(f"{self.name}/{category}: timeframe {tf!r} is not in {self.timeframes}")
+        return self.timeframes.index(tf)
+
+    def _compile_bucket(self, category, rule):
+        trend_terms = []
+        for tf, direction in rule.get('trend', {}).items():
+            if direction not in TREND_CODES:
+                raise ValueError(f"{self.name}/{category}: trend must be one of {list(TREND_CODES)}, not {direction!r}")
+            trend_terms.append((self._column(category, tf), TREND_CODES[direction]))
+        rsi_terms = [(self._column(category, tf), op, value)
+                     for tf, bound in rule.get('rsi', {}).items() for op, value in _bounds(bound)]
+        return category, trend_terms, rsi_terms, bool(rule.get('rsi_optional', False))
+
+    def masks(self, trend, rsi, apply_momentum_filter=True, apply_rsi_filter=True):
+        """{category: bool mask (S,)}, at most one True per symbol."""
+        if not apply_momentum_filter:
+            trend = np.zeros_like(trend)  # trends fall back to neutral when the filter is off
+        taken = np.zeros(len(trend), dtype=bool)
+        out = {}
+        for category, trend_terms, rsi_terms, rsi_optional in self.buckets:
+            mask = ~taken
+            if not apply_rsi_filter and not rsi_optional:
+                mask = np.zeros_like(taken)
+            for col, code in trend_terms:
+                mask &= trend[:, col] == code
+            if apply_rsi_filter:
+                for col, op, value in rsi_terms:
+                    mask &= op(rsi[:, col], value)  # NaN fails every bound
+            taken |= mask
+            out[category] = mask
+        return out
+
+
+def compile_rules(spec):
+    return CompiledRules(spec)
+
+
+def load_rules(path):
+    """Compile a spec from a YAML (or JSON) file shaped like V5_RULES."""
+    with open(path) as f:
+        return compile_rules(yaml.safe_load(f))
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+
+# === CONFIG ===
+UNIVERSE_FILE = "symbol_universe.json"
+UNIVERSE_TTL = 900  # seconds before the cheap listing check
+UNIVERSE_MAX_AGE = 6 * 3600  # seconds before exchangeInfo is re-downloaded regardless
+
+EXCHANGE_INFO_PATH = "/fapi/v1/exchangeInfo"  # hundreds of KB
+PRICE_LISTING_PATH = "/fapi/v1/ticker/price"  # a few KB, every listed contract
+KEPT_FIELDS = ('symbol', 'contractType', 'quoteAsset', 'baseAsset', 'status', 'onboardDate')
+
+
+def usdt_perpetual(info):
+    return (info.get('contractType') == 'PERPETUAL'
+            and info.get('quoteAsset') == 'USDT'
+            and info.get('status') == 'TRADING')
+
+
+# === SYMBOL UNIVERSE ===
+class SymbolUniverse:
+    """exchangeInfo symbols cached in memory and on disk.
+
+    `fetch_json(path)` performs a GET against the futures API. Within `ttl` nothing is
+    requested. After it, the small all-symbols price listing is compared with the cached
+    contracts, and exchangeInfo is only downloaded again when a contract appeared or a
+    tradable one vanished, or once the copy is `max_age` old (status changes such as
+    SETTLING don't show in the listing). `last_diff` holds the tradable symbols added
+    and delisted by the latest full refresh.
+    """
+
+    def __init__(self, fetch_json, path=UNIVERSE_FILE, ttl=UNIVERSE_TTL, max_age=UNIVERSE_MAX_AGE):
+        self.fetch_json = fetch_json
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.last_diff = {'added': [], 'delisted': []}
+        self._symbols = None  # symbol -> KEPT_FIELDS subset
+        self._fetched_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def symbols(self, predicate=usdt_perpetual):
+        """Symbols matching `predicate`, in exchangeInfo order, refreshing first if due."""
+        with self._lock:
+            self._ensure_fresh()
+            return [s for s, info in self._symbols.items() if predicate(info)]
+
+    def info(self, symbol):
+        with self._lock:
+            self._ensure_fresh()
+            return self._symbols.get(symbol)
+
+    def refresh(self):
+        """Force a full exchangeInfo download."""
+        with self._lock:
+            self._download()
+            return self.last_diff
+
+    # --- internals (lock held) ---
+    def _ensure_fresh(self):
+        now = time.time()
+        if self._symbols is None:
+            self._load()
+        if self._symbols is None or now - self._fetched_at > self.max_age:
+            self._download()
+        elif now - self._checked_at > self.ttl:
+            if self._listing_changed():
+                self._download()
+            else:
+                self._checked_at = now
+                self._save()
+
+    def _listing_changed(self):
+        try:
+            listed = {row['symbol'] for row in self.fetch_json(PRICE_LISTING_PATH)}
+        except Exception as e:
+            print(f"Symbol listing check failed ({e}); refreshing exchangeInfo")
+            return True
+        tradable = {s for s, info in self._symbols.items() if usdt_perpetual(info)}
+        return bool(listed - set(self._symbols)) or bool(tradable - listed)
+
+    def _download(self):
+        try:
+            exchange_info = self.fetch_json(EXCHANGE_INFO_PATH)
+            symbols = {s['symbol']: {k: s.get(k) for k in KEPT_FIELDS} for s in exchange_info['symbols']}
+        except Exception as e:
+            if self._symbols is None:
+                raise
+            print(f"exchangeInfo refresh failed ({e}); keeping the cached universe")
+            # Retry after another ttl rather than on every call while Binance is down
+            now = time.time()
+            self._checked_at = now
+            self._fetched_at = max(self._fetched_at, now - self.max_age + self.ttl)
+            return
+
+        if self._symbols is not None:
+            old = {s for s, info in self._symbols.items() if usdt_perpetual(info)}
+            new = {s for s, info in symbols.items() if usdt_perpetual(info)}
+            self.last_diff = {'added': sorted(new - old), 'delisted': sorted(old - new)}
+            if self.last_diff['added'] or self.last_diff['delisted']:
+                print(f"Symbol universe changed: +{self.last_diff['added']} -{self.last_diff['delisted']}")
+        self._symbols = symbols
+        self._fetched_at = self._checked_at = time.time()
+        self._save()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self._symbols = data['symbols']
+        self._fetched_at = data['fetched_at']
+        self._checked_at = data['checked_at']
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({'fetched_at': self._fetched_at, 'checked_at': self._checked_at,
+                           'symbols': self._symbols}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Couldn't persist the symbol universe: {e}")
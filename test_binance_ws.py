@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import websockets
+
+import binance_ws
+from binance_ws import KlineStream
+from kline_cache import OPEN_TIME
+
+# === FAKE EXCHANGE ===
+STEP = 15 * 60_000
+SYMBOL = "BTCUSDT"
+INTERVAL = "15m"
+
+
+def candle(n, close):
+    """Raw REST kline row for the n-th candle."""
+    return [n * STEP, "1", "2", "0.5", str(close), "10", (n + 1) * STEP - 1, "100", 5, "4", "40", "0"]
+
+
+def frame(row, closed):
+    """Combined-stream kline frame carrying `row`, as recorded from fstream."""
+    k = dict(zip("tohlcvTqnVQB", row), i=INTERVAL, s=SYMBOL, x=closed)
+    return json.dumps({"stream": f"{SYMBOL.lower()}@kline_{INTERVAL}", "data": {"e": "kline", "s": SYMBOL, "k": k}})
+
+
+class FakeBinance:
+    """REST klines plus a websocket server replaying one batch of frames per connection."""
+
+    def __init__(self, rows, sessions):
+        self.rows = rows  # what /fapi/v1/klines returns, the last row forming
+        self.sessions = sessions  # per connection: (frames to send, rows after it drops)
+        self.seeds = 0
+        self.connections = 0
+
+    def seed(self, symbol, interval):
+        self.seeds += 1
+        return [list(row) for row in self.rows]
+
+    async def handler(self, ws, *args):
+        self.connections += 1
+        if self.connections > len(self.sessions):
+            async for _ in ws:  # stay connected and quiet until the client leaves
+                pass
+            return
+        frames, rows_after = self.sessions[self.connections - 1]
+        for message in frames:
+            await ws.send(message)
+        if rows_after is not None:
+            self.rows = rows_after  # candles keep closing while the client is offline
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def run_stream(exchange, check, window=8):
+    updates = []
+
+    def on_update(symbol, buffers):
+        updates.append([row[:] for row in buffers[INTERVAL]])
+        return buffers[INTERVAL][-1][4]
+
+    async def main():
+        async with websockets.serve(exchange.handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            stream = KlineStream([SYMBOL], [INTERVAL], seed=exchange.seed, on_update=on_update,
+                                 window=window, base_url=f"ws://127.0.0.1:{port}", debounce=0.02)
+            task = asyncio.create_task(stream.run())
+            try:
+                await check(stream, updates)
+            finally:
+                stream._stopped = True
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def open_times(rows):
+    return [row[OPEN_TIME] // STEP for row in rows]
+
+
+# === TESTS ===
+def test_seed_keeps_the_window():
+    exchange = FakeBinance([candle(n, 100 + n) for n in range(10)], [([], None)])
+
+    async def check(stream, updates):
+        await wait_for(lambda: updates)
+        assert open_times(stream.buffers[(SYMBOL, INTERVAL)]) == list(range(2, 10))
+        assert stream.results[SYMBOL] == "109"
+
+    run_stream(exchange, check)
+
+
+def test_forming_update_replaces_and_close_appends():
+    rows = [candle(n, 100 + n) for n in range(10)]
+    frames = [frame(candle(9, 120), False), frame(candle(9, 121), True), frame(candle(10, 122), False)]
+    exchange = FakeBinance(rows, [(frames, None)])
+
+    async def check(stream, updates):
+        await wait_for(lambda: stream.results.get(SYMBOL) == "122")
+        buffer = stream.buffers[(SYMBOL, INTERVAL)]
+        assert open_times(buffer) == list(range(3, 11))
+        assert buffer[-2][4] == "121"  # the closed candle keeps its final close
+
+    run_stream(exchange, check)
+
+
+def test_reconnect_backfills_missed_candles(monkeypatch):
+    monkeypatch.setattr(binance_ws, "RECONNECT_DELAY", 0.01)
+    rows = [candle(n, 100 + n) for n in range(10)]
+    # Candles 10 and 11 close while the connection is down; only REST knows them
+    offline = [candle(n, 100 + n) for n in range(13)]
+    first = ([frame(candle(9, 109), True), frame(candle(10, 150), False)], offline)
+    second = ([frame(candle(12, 130), False)], None)
+    exchange = FakeBinance(rows, [first, second])
+
+    async def check(stream, updates):
+        await wait_for(lambda: stream.results.get(SYMBOL) == "130")
+        buffer = stream.buffers[(SYMBOL, INTERVAL)]
+        assert open_times(buffer) == list(range(5, 13))  # contiguous, nothing skipped
+        assert [row[4] for row in buffer[-3:-1]] == ["110", "111"]  # REST closes, not the stale tick
+        assert exchange.connections == 2 and exchange.seeds == 2
+        assert all(open_times(rows) == list(range(open_times(rows)[0], open_times(rows)[-1] + 1))
+                   for rows in updates)
+
+    run_stream(exchange, check)
+
+
+def test_apply_event_tells_forming_from_closed():
+    stream = KlineStream([SYMBOL], [INTERVAL], seed=None, on_update=None, window=8)
+    stream.buffers[(SYMBOL, INTERVAL)] = [candle(n, 100 + n) for n in range(10)]
+
+    def apply(row, closed):
+        return stream.apply_event(json.loads(frame(row, closed))['data'])
+
+    assert apply(candle(9, 120), closed=False) is False  # forming tick: replaced in place
+    assert apply(candle(9, 121), closed=True) is True  # close: re-evaluate now
+    assert apply(candle(10, 122), closed=False) is False  # next candle opens
+    assert apply(candle(8, 90), closed=True) is False  # stale frame is ignored
+    buffer = stream.buffers[(SYMBOL, INTERVAL)]
+    assert open_times(buffer) == list(range(3, 11))
+    assert [row[4] for row in buffer[-3:]] == ["108", "121", "122"]
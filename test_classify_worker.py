@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+import classify_worker
+from classify_worker import classify_klines
+from strategy_rules import V2_RULES, BOUND_OPS
+
+# === FIXTURES ===
+STEPS = {'15m': 15 * 60_000, '1h': 60 * 60_000, '4h': 4 * 60 * 60_000}
+
+
+def payload(interval, rsi, n=250, size=0.004):
+    """A /fapi/v1/klines body alternating up/down moves sized so RSI settles near `rsi`.
+
+    Above 50 the series climbs (fans bullish), below 50 it falls (fans bearish).
+    """
+    up, down = size * rsi / 50, size * (100 - rsi) / 50
+    closes = 100 * np.exp(np.cumsum(np.where(np.arange(n) % 2 == 0, up, -down)))
+    step = STEPS[interval]
+    rows = [[k * step, f"{c:.6f}", f"{c * 1.002:.6f}", f"{c * 0.998:.6f}", f"{c:.6f}", "10",
+             (k + 1) * step - 1, "100", 5, "4", "40", "0"] for k, c in enumerate(closes)]
+    return json.dumps(rows).encode()
+
+
+# Target RSI per 15m/1h/4h (lands ~2 lower) -> bucket under V2_RULES
+CASES = [
+    ((58, 58, 58), 'bullish_in_range'),
+    ((65, 65, 60), 'bullish_range_break'),
+    ((65, 65, 70), None),  # 4h over the v2 cap of 65 (v5 would still take it)
+    ((45, 45, 45), 'bearish_in_range'),
+    ((36, 36, 50), 'bearish_range_break'),
+    ((36, 36, 40), None),  # 4h under the v2 floor of 45 (v5 would still take it)
+    ((58, 45, 58), None),  # 15m and 1h fans disagree
+]
+
+
+# === REFERENCE: the spec read directly ===
+def spec_bucket(signals, spec=V2_RULES):
+    keys = dict(zip(spec['timeframes'], ('m15', 'h1', 'h4')))
+    for category, rule in spec['buckets'].items():
+        if any(signals[f'{keys[tf]}_trend'] != want for tf, want in rule.get('trend', {}).items()):
+            continue
+        ok = True
+        for tf, bound in rule.get('rsi', {}).items():
+            value = signals[f'{keys[tf]}_rsi']
+            if isinstance(bound, list):
+                ok &= bound[0] <= value <= bound[1]
+            else:
+                ok &= all(BOUND_OPS[op](value, limit) for op, limit in bound.items())
+        if ok:
+            return category
+    return None
+
+
+# === TESTS ===
+@pytest.mark.parametrize("targets, bucket", CASES)
+def test_worker_buckets_follow_v2_rules(targets, bucket):
+    payloads = [payload(interval, rsi) for interval, rsi in zip(STEPS, targets)]
+    frames = {interval: classify_worker.decode_klines(p) for interval, p in zip(STEPS, payloads)}
+    signals = classify_worker.compute_signals(frames)
+
+    assert spec_bucket(signals) == bucket
+    assert classify_klines("TESTUSDT", *payloads) == bucket
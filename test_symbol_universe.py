@@ -0,0 +1,60 @@
+import symbol_universe
+from symbol_universe import SymbolUniverse, EXCHANGE_INFO_PATH, PRICE_LISTING_PATH
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT']
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class FlakyBinance:
+    """fetch_json stub that fails while `down` is set, counting calls per path."""
+
+    def __init__(self):
+        self.down = False
+        self.calls = {EXCHANGE_INFO_PATH: 0, PRICE_LISTING_PATH: 0}
+
+    def __call__(self, path, params=None):
+        self.calls[path] += 1
+        if self.down:
+            raise ConnectionError("exchange unreachable")
+        if path == EXCHANGE_INFO_PATH:
+            return {'symbols': [{'symbol': s, 'contractType': 'PERPETUAL', 'quoteAsset': 'USDT',
+                                 'status': 'TRADING'} for s in SYMBOLS]}
+        return [{'symbol': s, 'price': "1.0"} for s in SYMBOLS]
+
+
+def test_failed_refresh_keeps_cache_and_backs_off(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(symbol_universe.time, 'time', clock.time)
+    binance = FlakyBinance()
+    universe = SymbolUniverse(binance, str(tmp_path / "universe.json"), ttl=900, max_age=6 * 3600)
+    assert universe.symbols() == SYMBOLS
+    assert binance.calls[EXCHANGE_INFO_PATH] == 1
+
+    # Past max_age with Binance down: one failed download, then the cached copy is served
+    clock.now += 6 * 3600 + 1
+    binance.down = True
+    for _ in range(20):
+        assert universe.symbols() == SYMBOLS
+        clock.now += 10
+    assert binance.calls[EXCHANGE_INFO_PATH] == 2
+
+    # The next attempt waits for another ttl
+    clock.now += 900
+    assert universe.symbols() == SYMBOLS
+    assert binance.calls[EXCHANGE_INFO_PATH] + binance.calls[PRICE_LISTING_PATH] > 2
+
+    # Once Binance answers again the universe is refreshed and the normal schedule resumes
+    binance.down = False
+    clock.now += 901
+    calls = dict(binance.calls)
+    assert universe.symbols() == SYMBOLS
+    assert binance.calls[EXCHANGE_INFO_PATH] == calls[EXCHANGE_INFO_PATH] + 1
+    assert universe.symbols() == SYMBOLS
+    assert binance.calls[EXCHANGE_INFO_PATH] == calls[EXCHANGE_INFO_PATH] + 1
@@ -2,11 +2,16 @@ import streamlit as st
 import pandas as pd
 import asyncio
 import aiohttp
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-import ta
-from ta.trend import EMAIndicator, SMAIndicator
-from ta.momentum import RSIIndicator
-import time
+from rate_limiter import limiter, request_weight, DEFAULT_BAN_SECONDS
+from classify_worker import classify_klines
+from liquidity import liquid_symbols, by_symbol, TICKER_PATH, PREMIUM_PATH, MAX_ABS_FUNDING_RATE
+from scan_metrics import metrics
+from live_buckets import LiveBuckets, buckets_by_symbol
+from batch_indicators import KLINE_WINDOWS
 
 # Initialize session state
 if 'scan_results' not in st.session_state:
@@ -18,8 +23,6 @@ if 'scan_results' not in st.session_state:
         'scan_time': None,
         'current_progress': 0,
         'current_symbol': '',
-        'last_request_time': time.time(),
-        'weight_used': 0,
         'live_results': {
             'bullish_in_range': [],
             'bullish_range_break': [],
@@ -28,123 +31,61 @@ if 'scan_results' not in st.session_state:
         }
     }
 
-if 'last_request_time' not in st.session_state:
-    st.session_state.last_request_time = time.time()
-
-if 'weight_used' not in st.session_state:
-    st.session_state.weight_used = 0
-
 # === CONFIG ===
 BASE_URL = "https://fapi.binance.com"
 TEST_MODE = False
 TEST_SYMBOLS_COUNT = 5
-MAX_CONCURRENT_REQUESTS = 3  # Very conservative limit
-REQUEST_DELAY = 0.3  # 300ms between requests
+MAX_CONCURRENT_REQUESTS = 20  # Pacing is left to the shared weight limiter
 MAX_RETRIES = 2
-RATE_LIMIT_WINDOW = 60  # 60 second rolling window
-MAX_WEIGHT_PER_MINUTE = 1100  # Stay under Binance's 1200 limit
 API_KEY = None  # Set if you have one for higher limits
-
-# === API PROTECTION UTILS ===
-def calculate_request_weight(endpoint, params=None):
-    """Estimate request weight based on Binance's docs"""
-    if 'klines' in endpoint:
-        return 1  # 1 weight per kline request
-    return 1  # Default weight
-
-async def check_rate_limit():
-    """Ensure we stay within rate limits"""
-    now = time.time()
-    elapsed = now - st.session_state.last_request_time
-    
-    # Reset weight if we're in a new minute
-    if elapsed > RATE_LIMIT_WINDOW:
-        st.session_state.weight_used = 0
-        st.session_state.last_request_time = now
-        return True
-    
-    if st.session_state.weight_used >= MAX_WEIGHT_PER_MINUTE:
-        wait_time = RATE_LIMIT_WINDOW - elapsed
-        st.warning(f"⚠️ Approaching rate limit. Waiting {wait_time:.1f}s...")
-        await asyncio.sleep(wait_time)
-        st.session_state.weight_used = 0
-        st.session_state.last_request_time = time.time()
-    
-    return True
-
-# === MOVING AVERAGE UTILS ===
-def calculate_ema(df: pd.DataFrame, period: int) -> pd.Series:
-    return EMAIndicator(close=df['close'], window=period).ema_indicator()
-
-def calculate_sma(df: pd.DataFrame, period: int) -> pd.Series:
-    return SMAIndicator(close=df['close'], window=period).sma_indicator()
-
-def calculate_rsi(df: pd.DataFrame, period: int) -> pd.Series:
-    return RSIIndicator(close=df['close'], window=period).rsi()
-
-def fully_fanned(df: pd.DataFrame, type_: str, periods: list) -> str:
-    try:
-        if type_ == 'ema':
-            ma1 = calculate_ema(df, periods[0])
-            ma2 = calculate_ema(df, periods[1])
-            ma3 = calculate_ema(df, periods[2])
-        else:
-            ma1 = calculate_sma(df, periods[0])
-            ma2 = calculate_sma(df, periods[1])
-            ma3 = calculate_sma(df, periods[2])
-
-        if len(ma1) < 1 or len(ma2) < 1 or len(ma3) < 1:
-            return "incomplete"
-
-        last_ma1 = ma1.iloc[-1]
-        last_ma2 = ma2.iloc[-1]
-        last_ma3 = ma3.iloc[-1]
-
-        if last_ma1 > last_ma2 > last_ma3:
-            return "bullish"
-        elif last_ma1 < last_ma2 < last_ma3:
-            return "bearish"
-        return "neutral"
-
-    except Exception as e:
-        print(f"Error in fully_fanned: {e}")
-        return "error"
+CLASSIFY_WORKERS = os.cpu_count() or 4  # processes running the indicator math
+PIPELINE_QUEUE_SIZE = 50  # symbols fetched or being fetched but not yet classified
+USE_LIQUIDITY_FILTER = True  # one bulk 24h ticker call instead of klines for illiquid pairs
+EXPOSE_METRICS = True  # Prometheus text format on http://127.0.0.1:9108/metrics
 
 # === SAFE API REQUESTS ===
-async def safe_api_request(session, url, params=None):
+async def safe_api_request(session, url, params=None, raw=False):
     retries = 0
-    endpoint = url.split('/')[-1]
+    weight = request_weight(url, params)
     
     while retries <= MAX_RETRIES:
-        await check_rate_limit()
-        weight = calculate_request_weight(endpoint, params)
+        # Process-wide budget shared with every other session on this IP
+        with metrics.stage("rate_limit_wait"):
+            await limiter.acquire_async(weight)
+        metrics.count_weight(url, weight)
         
         try:
             headers = {}
             if API_KEY:
                 headers['X-MBX-APIKEY'] = API_KEY
                 
-            async with session.get(url, params=params, headers=headers) as response:
-                # Update rate limit tracking
-                st.session_state.weight_used += weight
-                st.session_state.last_request_time = time.time()
-                
-                if response.status == 429:
-                    wait_time = int(response.headers.get('Retry-After', 10))
-                    st.error(f"🔴 Rate limited! Waiting {wait_time}s (Retry {retries+1}/{MAX_RETRIES})")
-                    await asyncio.sleep(wait_time)
-                    retries += 1
-                    continue
-                    
-                if response.status == 418:  # IP banned
-                    st.error("🔴 IP Banned - Stop all requests and wait")
-                    return None
+            with metrics.stage("http"):
+                async with session.get(url, params=params, headers=headers) as response:
+                    limiter.update_from_headers(response.headers)
+                    metrics.count_request(url, response.status)
                     
-                response.raise_for_status()
-                return await response.json()
+                    if response.status == 429:
+                        wait_time = int(response.headers.get('Retry-After', 10))
+                        limiter.backoff(wait_time)
+                        st.error(f"🔴 Rate limited! Waiting {wait_time}s (Retry {retries+1}/{MAX_RETRIES})")
+                        retries += 1
+                        if retries <= MAX_RETRIES:
+                            metrics.count_retry(url, "429")
+                        continue
+                        
+                    if response.status == 418:  # IP banned
+                        limiter.backoff(int(response.headers.get('Retry-After', DEFAULT_BAN_SECONDS)))
+                        st.error("🔴 IP Banned - Stop all requests and wait")
+                        return None
+                        
+                    response.raise_for_status()
+                    # raw=True hands the undecoded body to the classify workers
+                    return await response.read() if raw else await response.json()
                 
         except Exception as e:
             retries += 1
+            if retries <= MAX_RETRIES:
+                metrics.count_retry(url, type(e).__name__)
             wait_time = min(2 ** retries, 10)  # Exponential backoff
             st.warning(f"⚠️ Error: {str(e)} - Retrying in {wait_time}s")
             await asyncio.sleep(wait_time)
@@ -160,8 +101,6 @@ async def get_futures_symbols(session):
         st.error("❌ Invalid API response or no symbols found")
         return []
     
-    await asyncio.sleep(REQUEST_DELAY)
-    
     symbols = [
         s['symbol'] for s in res['symbols']
         if s.get('contractType') == 'PERPETUAL'
@@ -171,27 +110,22 @@ async def get_futures_symbols(session):
     ]
     return symbols[:TEST_SYMBOLS_COUNT] if TEST_MODE else symbols
 
-async def fetch_ohlcv(session, symbol, interval, limit=100):  # Reduced from 150
-    url = f"{BASE_URL}/fapi/v1/klines"
-    params = {"symbol": symbol, "interval": interval, "limit": limit}
-    
-    data = await safe_api_request(session, url, params)
-    if not data:
-        return None
-    
-    await asyncio.sleep(REQUEST_DELAY)
-    
+async def prefilter_symbols(session, symbols):
     try:
-        df = pd.DataFrame(data, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        df['close'] = df['close'].astype(float)
-        return df
-    except Exception as e:
-        st.error(f"Error processing {symbol}: {str(e)}")
-        return None
+        tickers = by_symbol(await safe_api_request(session, f"{BASE_URL}{TICKER_PATH}"))
+        premium = None
+        if MAX_ABS_FUNDING_RATE is not None:
+            premium = by_symbol(await safe_api_request(session, f"{BASE_URL}{PREMIUM_PATH}"))
+    except ValueError:
+        st.warning("⚠️ 24h ticker unavailable - scanning all symbols")
+        return symbols
+    return liquid_symbols(symbols, tickers, premium)
+
+async def fetch_klines_raw(session, symbol, interval, limit=None):
+    url = f"{BASE_URL}/fapi/v1/klines"
+    # Sized to the indicators: SMA-100 needs 100 candles, EMA-100 a longer warmup
+    params = {"symbol": symbol, "interval": interval, "limit": limit or KLINE_WINDOWS[interval]}
+    return await safe_api_request(session, url, params, raw=True)
 
 async def check_api_health(session):
     try:
@@ -201,76 +135,48 @@ async def check_api_health(session):
     except:
         return False
 
-async def classify_token(session, symbol, progress_bar, status_text, total_symbols, current_index):
-    try:
-        # Fetch data for all timeframes concurrently
-        m15, h1, h4 = await asyncio.gather(
-            fetch_ohlcv(session, symbol, "15m"),
-            fetch_ohlcv(session, symbol, "1h"),
-            fetch_ohlcv(session, symbol, "4h"),
-        )
-        
-        if m15 is None or h1 is None or h4 is None:
-            return None
-
-        # Calculate trends
-        m15_trend = fully_fanned(m15, 'ema', [21, 55, 100])
-        h1_trend = fully_fanned(h1, 'sma', [7, 30, 100])
-        h4_trend = fully_fanned(h4, 'sma', [7, 30, 100])
-
-        # Calculate RSI values
+# === FETCH -> CLASSIFY PIPELINE ===
+@st.cache_resource
+def get_process_pool():
+    # Spawned, not forked: forking the threaded Streamlit server can copy held locks into the children
+    return ProcessPoolExecutor(max_workers=CLASSIFY_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+async def fetch_stage(session, symbol, queue, slots):
+    # A slot is held from fetch to classified, so payloads waiting on busy workers stay bounded
+    await slots.acquire()
+    # Fetch data for all timeframes concurrently
+    payloads = await asyncio.gather(
+        fetch_klines_raw(session, symbol, "15m"),
+        fetch_klines_raw(session, symbol, "1h"),
+        fetch_klines_raw(session, symbol, "4h"),
+    )
+    await queue.put((symbol, None if any(p is None for p in payloads) else payloads))
+
+async def classify_one(pool, symbol, payloads, results):
+    classification = None
+    if payloads is not None:
         try:
-            m15_rsi_series = calculate_rsi(m15, 14)
-            h1_rsi_series = calculate_rsi(h1, 14)
-            h4_rsi_series = calculate_rsi(h4, 14)
+            loop = asyncio.get_running_loop()
+            with metrics.stage("classify"):  # decode + indicators in a worker, plus the hand-off
+                classification = await loop.run_in_executor(pool, classify_klines, symbol, *payloads)
+        except Exception as e:
+            print(f"Error classifying {symbol}: {e}")
+    await results.put((symbol, classification))
 
-            if m15_rsi_series.empty or h1_rsi_series.empty or h4_rsi_series.empty:
-                raise ValueError("RSI series is empty")
+async def classify_stage(queue, pool, results, total_symbols, slots):
+    # Decoding and indicator math run in worker processes so the event loop keeps reading sockets.
+    # One consumer per process: each takes the next symbol only once its worker is free.
+    remaining = total_symbols
 
-            m15_rsi = m15_rsi_series.iloc[-1]
-            h1_rsi = h1_rsi_series.iloc[-1]
-            h4_rsi = h4_rsi_series.iloc[-1]
+    async def consume():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            symbol, payloads = await queue.get()
+            await classify_one(pool, symbol, payloads, results)
+            slots.release()
 
-        except Exception as e:
-            print(f"Skipping symbol due to RSI error: {e}")
-            return  # or continue, depending on your structure
-
-        # Check for bullish conditions
-        if m15_trend == h1_trend == 'bullish':
-            # Bullish - In Range (50-60)
-            if (50 <= m15_rsi <= 60) and (50 <= h1_rsi <= 60) and (50 <= h4_rsi <= 60):
-                classification = 'bullish_in_range'
-            # Bullish - Range Break (60-70)
-            elif (60 <= m15_rsi <= 70) and (60 <= h1_rsi <= 70) and (h4_rsi < 65):
-                classification = 'bullish_range_break'
-            else:
-                return None
-        
-        # Check for bearish conditions
-        elif m15_trend == h1_trend == 'bearish':
-            # Bearish - In Range (40-50)
-            if (40 <= m15_rsi <= 50) and (40 <= h1_rsi <= 50) and (40 <= h4_rsi <= 50):
-                classification = 'bearish_in_range'
-            # Bearish - Range Break (30-40)
-            elif (30 <= m15_rsi <= 40) and (30 <= h1_rsi <= 40) and (h4_rsi > 45):
-                classification = 'bearish_range_break'
-            else:
-                return None
-        else:
-            return None
-        
-        # Update progress
-        progress = (current_index + 1) / total_symbols
-        st.session_state.current_progress = progress
-        st.session_state.current_symbol = symbol
-        progress_bar.progress(progress)
-        status_text.text(f"🔍 Scanning {symbol} ({current_index+1}/{total_symbols})")
-        
-        return symbol, classification
-    
-    except Exception as e:
-        st.error(f"Error classifying {symbol}: {str(e)}")
-        return None
+    await asyncio.gather(*(consume() for _ in range(min(CLASSIFY_WORKERS, total_symbols))))
 
 async def run_scanner_async():
     # Initialize live display containers
@@ -279,49 +185,79 @@ async def run_scanner_async():
     
     # Create columns for live results
     col1, col2, col3, col4 = st.columns(4)
+    placeholders = {}
     
     with col1:
         st.subheader("🐂 Bullish - In Range")
-        live_bullish_in_range = st.empty()
+        placeholders['bullish_in_range'] = st.empty()
     with col2:
         st.subheader("🚀 Bullish - Break")
-        live_bullish_break = st.empty()
+        placeholders['bullish_range_break'] = st.empty()
     with col3:
         st.subheader("🐻 Bearish - In Range")
-        live_bearish_in_range = st.empty()
+        placeholders['bearish_in_range'] = st.empty()
     with col4:
         st.subheader("💥 Bearish - Break")
-        live_bearish_break = st.empty()
+        placeholders['bearish_range_break'] = st.empty()
+
+    def render_bucket(category, bucket_symbols):
+        placeholders[category].write(bucket_symbols or "None")
+
+    # Start from the previous scan's buckets; only symbols that move get redrawn
+    categories = list(placeholders)
+    live = LiveBuckets(categories, render_bucket, initial=buckets_by_symbol(st.session_state.scan_results, categories))
 
+    pool = get_process_pool()
+    metrics.begin_scan()
     connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
     async with aiohttp.ClientSession(connector=connector) as session:
-        symbols = await get_futures_symbols(session)
+        with metrics.stage("symbols"):
+            symbols = await get_futures_symbols(session)
+        if USE_LIQUIDITY_FILTER:
+            with metrics.stage("prefilter"):
+                symbols = await prefilter_symbols(session, symbols)
         total_symbols = len(symbols)
-        
-        # Process symbols in batches to update UI more frequently
-        batch_size = 5
-        for i in range(0, total_symbols, batch_size):
-            batch = symbols[i:i + batch_size]
-            tasks = [classify_token(session, sym, progress_bar, status_text, total_symbols, i + idx) 
-                    for idx, sym in enumerate(batch)]
-            
-            for task in asyncio.as_completed(tasks):
-                result = await task
-                if result:
-                    symbol, classification = result
-                    st.session_state.scan_results['live_results'][classification].append(symbol)
-                    st.session_state.scan_results[classification].append(symbol)
-                    
-                    # Update live displays
-                    live_bullish_in_range.write(st.session_state.scan_results['live_results']['bullish_in_range'] or "None")
-                    live_bullish_break.write(st.session_state.scan_results['live_results']['bullish_range_break'] or "None")
-                    live_bearish_in_range.write(st.session_state.scan_results['live_results']['bearish_in_range'] or "None")
-                    live_bearish_break.write(st.session_state.scan_results['live_results']['bearish_range_break'] or "None")
+        live.drop_missing(symbols)
+
+        queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        slots = asyncio.Semaphore(PIPELINE_QUEUE_SIZE)
+        results = asyncio.Queue()
+        fetchers = [asyncio.create_task(fetch_stage(session, sym, queue, slots)) for sym in symbols]
+        classifier = asyncio.create_task(classify_stage(queue, pool, results, total_symbols, slots))
+
+        # Results arrive in order of completion
+        for done in range(1, total_symbols + 1):
+            symbol, classification = await results.get()
+            live.update(symbol, classification)
+
+            # Progress and changed columns are redrawn at a capped frame rate, not per symbol
+            with metrics.stage("render"):
+                if live.frame():
+                    progress = done / total_symbols
+                    st.session_state.current_progress = progress
+                    st.session_state.current_symbol = symbol
+                    progress_bar.progress(progress)
+                    status_text.text(f"🔍 Scanning {symbol} ({done}/{total_symbols})")
+
+        await asyncio.gather(classifier, *fetchers)
 
     # Finalize results
+    live.frame(force=True)
+    for category, bucket_symbols in live.results().items():
+        st.session_state.scan_results[category] = bucket_symbols
+        st.session_state.scan_results['live_results'][category] = list(bucket_symbols)
     st.session_state.scan_results['scan_time'] = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     progress_bar.empty()
     status_text.success("✅ Scan completed!")
+    render_changes(live.events)
+    with st.expander("⏱️ Scan timing"):
+        st.dataframe(metrics.end_scan(), hide_index=True)
+
+def render_changes(events):
+    entered = [f"{symbol} ({new.replace('_', ' ')})" for symbol, old, new in events if new]
+    left = [symbol for symbol, old, new in events if old and not new]
+    if entered or left:
+        st.caption(f"🔀 Since the last scan — entered: {', '.join(entered) or 'none'} — left: {', '.join(left) or 'none'}")
 
 def run_scanner():
     asyncio.run(run_scanner_async())
@@ -330,6 +266,9 @@ def run_scanner():
 st.set_page_config(page_title="Binance Trend Scanner", layout="wide")
 st.title("📈 Binance Futures Trend Scanner")
 
+if EXPOSE_METRICS:
+    metrics.serve()
+
 st.markdown("""
 Scan for trending Binance USDT Perpetual tokens using:
 - 21/55/100 EMAs on 15m
@@ -1,5 +1,5 @@
 import streamlit as st
-import requests
+import http_session
 import pandas as pd
 import time
 from datetime import datetime
@@ -63,7 +63,7 @@ def fully_fanned(df: pd.DataFrame, type_: str, periods: list) -> str:
 
 # === BINANCE API UTILS ===
 def get_futures_symbols():
-    res = requests.get(f"{BASE_URL}/fapi/v1/exchangeInfo").json()
+    res = http_session.get(f"{BASE_URL}/fapi/v1/exchangeInfo").json()
     symbols = [
         s['symbol']
         for s in res['symbols']
@@ -78,7 +78,7 @@ def fetch_ohlcv(symbol, interval, limit=150):
     try:
         url = f"{BASE_URL}/fapi/v1/klines"
         params = {"symbol": symbol, "interval": interval, "limit": limit}
-        response = requests.get(url, params=params)
+        response = http_session.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         df = pd.DataFrame(data, columns=[
@@ -1,5 +1,5 @@
 import streamlit as st
-import requests
+import http_session
 import pandas as pd
 import time
 from datetime import datetime, timedelta
@@ -7,14 +7,23 @@ import ta
 from ta.trend import EMAIndicator, SMAIndicator
 from ta.momentum import RSIIndicator
 from streamlit_autorefresh import st_autorefresh
-from binance.client import Client
-
-# Load API keys securely
-api_key = st.secrets["binance"]["api_key"]
-api_secret = st.secrets["binance"]["api_secret"]
-
-# Create Binance client
-client = Client(api_key, api_secret)
+from kline_cache import KlineCache
+from candle_archive import CandleArchive, ARCHIVE_DIR
+from kline_decode import loads, rows_to_array, CLASSIFIER_FIELDS, OHLCV_FIELDS
+from resample import resample, source_depth
+from binance_ws import KlineStream
+from indicator_state import SignalTracker
+from batch_indicators import signals_batch, classify_signals, CATEGORIES, KLINE_WINDOWS, TIMEFRAMES
+from scan_service import ScanService, SCAN_INTERVAL, seconds_to_next_run
+from priority import PriorityScheduler, SCHEDULER_TICK
+from rate_limiter import limiter, request_weight, DEFAULT_BAN_SECONDS
+from liquidity import LiquidityFilter
+from symbol_universe import SymbolUniverse
+from scan_metrics import metrics
+from live_buckets import bucket_changes, buckets_by_symbol
+from shard_coordinator import SQLiteCoordinator, SHARD_COUNT
+from candle_clock import ClosedCandleTracker, closed_rows, seconds_to_next_close
+from scan_history import ScanHistory, HISTORY_DB
 
 # Initialize session state
 if 'scan_results' not in st.session_state:
@@ -36,7 +45,20 @@ if 'scan_results' not in st.session_state:
 
 # === CONFIG ===
 BASE_URL = "https://fapi.binance.com"
+TEST_MODE = False  # Limit the shared scan to TEST_SYMBOLS_COUNT tokens
 TEST_SYMBOLS_COUNT = 50
+USE_BATCH_ENGINE = False  # Classify the whole universe in one NumPy pass
+USE_LIQUIDITY_FILTER = True  # drop low-turnover symbols via one bulk 24h ticker call
+USE_PRIORITY_SCHEDULER = True  # rescan near-threshold symbols every minute, flat ones less often
+STREAM_INTERVALS = ["15m", "1h", "4h"]
+STREAM_REFRESH_MS = 5000  # how often the page re-reads streamed results
+PAGE_REFRESH_MS = 10000  # how often the page re-reads the scan service snapshot
+RESAMPLE_FROM_15M = False  # one deep 15m request per symbol, 1h/4h built in-process
+USE_CANDLE_ARCHIVE = True  # persist closed candles to ARCHIVE_DIR and warm-start from them
+EXPOSE_METRICS = True  # Prometheus text format on http://127.0.0.1:9108/metrics
+SHARD_DB = None  # path to a SQLite file shared by several scanner nodes to split the universe between them
+CLOSED_CANDLES_ONLY = False  # evaluate closed candles only, once per 15m close; overrides USE_PRIORITY_SCHEDULER
+USE_SCAN_HISTORY = True  # append every scan to HISTORY_DB for the history panel
 
 # === MOVING AVERAGE UTILS ===
 def calculate_ema(df: pd.DataFrame, period: int) -> pd.Series:
@@ -70,96 +92,352 @@ def fully_fanned(df: pd.DataFrame, type_: str, periods: list) -> str:
         return 'neutral'
 
 # === BINANCE API UTILS ===
-def get_futures_symbols():
+def get_futures_symbols(test_mode=False):
     try:
-        exchange_info = client.futures_exchange_info()
-        symbols = [
-            s['symbol']
-            for s in exchange_info['symbols']
-            if s['contractType'] == 'PERPETUAL'
-            and s['quoteAsset'] == 'USDT'
-            and s['status'] == 'TRADING'
-        ]
-        return symbols
+        symbols = get_symbol_universe().symbols()
+        return symbols[:TEST_SYMBOLS_COUNT] if test_mode else symbols
     except Exception as e:
         st.error(f"⚠️ Error fetching Binance data: {e}")
         return []
 
-def fetch_ohlcv(symbol, interval, limit=150):
+def fetch_json(path, params=None):
+    weight = request_weight(path, params)
+    with metrics.stage("rate_limit_wait"):
+        limiter.acquire(weight)
+    metrics.count_weight(path, weight)
+    with metrics.stage("http"):
+        response = http_session.get(f"{BASE_URL}{path}", params=params)
+    limiter.update_from_headers(response.headers)
+    metrics.count_request(path, response.status_code)
+    # Pause every thread on this IP before the error surfaces, or the next symbol goes straight out
+    if response.status_code == 429:
+        limiter.backoff(int(response.headers.get('Retry-After', 10)))
+    elif response.status_code == 418:  # IP banned
+        limiter.backoff(int(response.headers.get('Retry-After', DEFAULT_BAN_SECONDS)))
+    response.raise_for_status()
+    with metrics.stage("decode"):
+        return loads(response.content)
+
+def fetch_klines(params):
+    return fetch_json("/fapi/v1/klines", params)
+
+# exchangeInfo is cached on disk and only re-downloaded when the listing changes
+@st.cache_resource
+def get_symbol_universe():
+    return SymbolUniverse(fetch_json)
+
+@st.cache_resource
+def get_liquidity_filter():
+    return LiquidityFilter(fetch_json)
+
+def get_scan_symbols(test_mode=False):
+    symbols = get_futures_symbols(test_mode)
+    return get_liquidity_filter().apply(symbols) if USE_LIQUIDITY_FILTER else symbols
+
+# One candle store per process, shared by every session and rerun
+@st.cache_resource
+def get_kline_cache():
+    archive = CandleArchive(ARCHIVE_DIR) if USE_CANDLE_ARCHIVE else None
+    return KlineCache(fetch_klines, archive)
+
+def klines_to_df(data):
+    # Typed open_time/close columns only; the other ten kline fields are never read
+    with metrics.stage("decode"):
+        arr = rows_to_array(data, CLASSIFIER_FIELDS)
+    with metrics.stage("dataframe"):
+        return pd.DataFrame(arr)
+
+def fetch_ohlcv(symbol, interval, limit=None):
     try:
-        url = f"{BASE_URL}/fapi/v1/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": limit}
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        df = pd.DataFrame(data, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        df['close'] = df['close'].astype(float)
-        return df
+        # Only as many candles as the indicators on this timeframe need
+        data = get_kline_cache().get(symbol, interval, limit or KLINE_WINDOWS[interval])
+        return klines_to_df(data)
     except Exception as e:
         st.error(f"Error fetching data for {symbol}: {str(e)}")
         return None
 
+def fetch_timeframes(symbol, cache, kline_windows=KLINE_WINDOWS):
+    """Typed 15m/1h/4h candles from three requests, or from one deep 15m series.
+
+    Each timeframe gets the window its indicators need (`kline_windows`). Resampling
+    needs ~1.6k 15m candles for 100 4h ones, so a cold fetch costs more weight (two
+    pages, 12) than three windows (6). Every cached rescan after that is a single small
+    15m request instead of three, and all timeframes share one snapshot.
+    """
+    if RESAMPLE_FROM_15M:
+        depth = max(kline_windows["15m"], source_depth(kline_windows["1h"], "1h"), source_depth(kline_windows["4h"], "4h"))
+        rows = cache.get(symbol, "15m", depth)
+        with metrics.stage("decode"):
+            m15 = rows_to_array(rows, OHLCV_FIELDS)
+            return {"15m": m15[-kline_windows["15m"]:],
+                    "1h": resample(m15, "1h")[-kline_windows["1h"]:],
+                    "4h": resample(m15, "4h")[-kline_windows["4h"]:]}
+    windows = {interval: cache.get(symbol, interval, kline_windows[interval]) for interval in ["15m", "1h", "4h"]}
+    with metrics.stage("decode"):
+        return {interval: rows_to_array(rows, CLASSIFIER_FIELDS) for interval, rows in windows.items()}
+
+# === CLASSIFICATION ===
+def compute_signals(m15, h1, h4):
+    with metrics.stage("indicators"):
+        return {
+            'm15_trend': fully_fanned(m15, 'ema', [21, 55, 100]),
+            'h1_trend': fully_fanned(h1, 'sma', [7, 30, 100]),
+            'h4_trend': fully_fanned(h4, 'sma', [7, 30, 100]),
+            'm15_rsi': calculate_rsi(m15, 14).iloc[-1],
+            'h1_rsi': calculate_rsi(h1, 14).iloc[-1],
+            'h4_rsi': calculate_rsi(h4, 14).iloc[-1],
+        }
+
+def bucket_from_signals(signals, apply_momentum_filter=True, apply_rsi_filter=True):
+    # Bucket rules live in strategy_rules.V5_RULES
+    buckets = classify_signals({'': signals}, apply_momentum_filter, apply_rsi_filter)
+    return next((category for category in CATEGORIES if buckets[category]), None)
+
 def classify_token(symbol, apply_momentum_filter=True, apply_rsi_filter=True):
     try:
         # Fetch data for all timeframes
-        m15 = fetch_ohlcv(symbol, "15m")
-        h1 = fetch_ohlcv(symbol, "1h")
-        h4 = fetch_ohlcv(symbol, "4h")
+        if RESAMPLE_FROM_15M:
+            frames = {interval: pd.DataFrame(arr) for interval, arr in fetch_timeframes(symbol, get_kline_cache()).items()}
+            m15, h1, h4 = frames["15m"], frames["1h"], frames["4h"]
+        else:
+            m15 = fetch_ohlcv(symbol, "15m")
+            h1 = fetch_ohlcv(symbol, "1h")
+            h4 = fetch_ohlcv(symbol, "4h")
         
         if m15 is None or h1 is None or h4 is None:
             return None
 
-        # Calculate trends
-        m15_trend = fully_fanned(m15, 'ema', [21, 55, 100])
-        h1_trend = fully_fanned(h1, 'sma', [7, 30, 100])
-        h4_trend = fully_fanned(h4, 'sma', [7, 30, 100])
-
-        # Calculate RSI values
-        m15_rsi = calculate_rsi(m15, 14).iloc[-1]
-        h1_rsi = calculate_rsi(h1, 14).iloc[-1]
-        h4_rsi = calculate_rsi(h4, 14).iloc[-1]
-
-        # === Trend (Momentum) Filtering ===
-        if apply_momentum_filter:
-            if not (m15_trend == h1_trend and m15_trend in ['bullish', 'bearish']):
-                return None
-        else:
-            m15_trend = h1_trend = 'neutral'  # fallback if filter is off
-
-        # === RSI Filtering ===
-        if apply_rsi_filter:
-            if m15_trend == h1_trend == 'bullish':
-                if (50 <= m15_rsi <= 60) and (50 <= h1_rsi <= 60) and (50 <= h4_rsi <= 60):
-                    return 'bullish_in_range'
-                elif (60 <= m15_rsi <= 70) and (60 <= h1_rsi <= 70) and (h4_rsi < 70):
-                    return 'bullish_range_break'
-            elif m15_trend == h1_trend == 'bearish':
-                if (40 <= m15_rsi <= 50) and (40 <= h1_rsi <= 50) and (40 <= h4_rsi <= 50):
-                    return 'bearish_in_range'
-                elif (30 <= m15_rsi <= 40) and (30 <= h1_rsi <= 40) and (h4_rsi > 30):
-                    return 'bearish_range_break'
-            return None
-        else:
-            # Return categories purely based on trend if RSI is disabled
-            if m15_trend == h1_trend == 'bullish':
-                return 'bullish_in_range'
-            elif m15_trend == h1_trend == 'bearish':
-                return 'bearish_in_range'
-            return None
+        signals = compute_signals(m15, h1, h4)
+        return bucket_from_signals(signals, apply_momentum_filter, apply_rsi_filter)
     
     except Exception as e:
         st.error(f"Error classifying {symbol}: {str(e)}")
         return None
 
-# Save latest results to disk
-def save_latest_results():
-    timestamp = st.session_state.scan_results['scan_time']
+# === STREAMING MODE ===
+# One websocket ingestion per process; buffers are seeded once from the kline cache and
+# every tick updates running indicator state instead of recomputing the whole window
+@st.cache_resource
+def get_kline_stream(test_mode=False):
+    cache = get_kline_cache()
+    return KlineStream(
+        get_scan_symbols(test_mode),
+        STREAM_INTERVALS,
+        seed=lambda symbol, interval: cache.get(symbol, interval, KLINE_WINDOWS[interval]),
+        on_update=SignalTracker().signals,
+        window=max(KLINE_WINDOWS.values()),
+        on_evaluate=save_latest_results,
+    ).start()
+
+# === SHARED SCAN SERVICE ===
+def fetch_arrays(symbol, cache):
+    # Runs on the service thread, so errors go to the log rather than st.error
+    try:
+        return fetch_timeframes(symbol, cache)
+    except Exception as e:
+        print(f"Error fetching data for {symbol}: {str(e)}")
+        return None
+
+def scan_market(service, cache, scheduler=None, symbol_filter=None):
+    metrics.begin_scan()
+    with metrics.stage("symbols"):
+        symbols = get_scan_symbols(TEST_MODE)
+    if symbol_filter is not None:
+        symbols = [symbol for symbol in symbols if symbol_filter(symbol)]
+    results, batch_closes = {}, {}
+    to_scan = symbols
+    if scheduler is not None:
+        # Partial pass: keep the last signals of symbols not due this tick
+        previous = service.latest()['results']
+        results = {symbol: previous[symbol] for symbol in symbols if symbol in previous}
+        scheduler.forget(set(scheduler.last_scanned) - set(symbols))
+        to_scan = scheduler.select(symbols)
+
+    for i, symbol in enumerate(to_scan):
+        service.report_progress(i + 1, len(to_scan), symbol)
+        arrays = fetch_arrays(symbol, cache)
+        if arrays is None:
+            if scheduler is not None:
+                scheduler.record(symbol, {})
+            continue
+
+        if USE_BATCH_ENGINE:
+            # Only collect candles here; everything is classified in one pass after the loop
+            batch_closes[symbol] = {interval: arr['close'] for interval, arr in arrays.items()}
+            continue
+        try:
+            with metrics.stage("dataframe"):
+                frames = {interval: pd.DataFrame(arr) for interval, arr in arrays.items()}
+            results[symbol] = compute_signals(frames["15m"], frames["1h"], frames["4h"])
+        except Exception as e:
+            print(f"Error classifying {symbol}: {e}")
+        if scheduler is not None:
+            scheduler.record(symbol, results.get(symbol, {}), arrays["15m"]['close'])
+
+    with metrics.stage("indicators"):
+        batch_results = signals_batch(batch_closes)
+    if scheduler is not None:
+        for symbol, signals in batch_results.items():
+            scheduler.record(symbol, signals, batch_closes[symbol]["15m"])
+    results.update(batch_results)
+    metrics.end_scan()
+    return results
+
+# === CLOSED-CANDLE MODE ===
+# Signals only move when a candle closes, so each pass refreshes just the timeframes that
+# closed since the last one: 15m every pass, 1h four times an hour, 4h six times a day
+def scan_closed_candles(service, cache, tracker, symbol_filter=None):
+    metrics.begin_scan()
+    with metrics.stage("symbols"):
+        symbols = get_scan_symbols(TEST_MODE)
+    if symbol_filter is not None:
+        symbols = [symbol for symbol in symbols if symbol_filter(symbol)]
+    previous = service.latest()['results']
+    results = {symbol: dict(previous[symbol]) for symbol in symbols if symbol in previous}
+    tracker.forget(symbols)
+
+    now_ms = int(time.time() * 1000)
+    closes = {interval: {} for interval in TIMEFRAMES}
+    for i, symbol in enumerate(symbols):
+        service.report_progress(i + 1, len(symbols), symbol)
+        for interval in TIMEFRAMES:
+            if symbol in results and not tracker.due(symbol, interval, now_ms):
+                continue
+            try:
+                # One extra candle so the window is full once the forming one is dropped
+                rows = closed_rows(cache.get(symbol, interval, KLINE_WINDOWS[interval] + 1), now_ms)
+            except Exception as e:
+                print(f"Error fetching data for {symbol}: {str(e)}")
+                continue
+            if symbol in results and not tracker.is_new(symbol, interval, rows):
+                continue
+            with metrics.stage("decode"):
+                closes[interval][symbol] = rows_to_array(rows, CLASSIFIER_FIELDS)['close']
+            tracker.record(symbol, interval, rows)
+
+    with metrics.stage("indicators"):
+        for interval, frames in closes.items():
+            batch = signals_batch({symbol: {interval: c} for symbol, c in frames.items()}, [interval])
+            for symbol, signals in batch.items():
+                results.setdefault(symbol, {}).update(signals)
+    metrics.end_scan()
+
+    # A symbol is published once every timeframe has been evaluated
+    return {symbol: signals for symbol, signals in results.items() if len(signals) == 2 * len(TIMEFRAMES)}
+
+# === SHARDED MODE ===
+# Nodes with separate IPs (and weight budgets) each scan a share of the universe
+@st.cache_resource
+def get_coordinator():
+    return SQLiteCoordinator(SHARD_DB).start()
+
+def scan_shard(service, coordinator, scan, scheduler=None):
+    shards = set(coordinator.claim_shards())
+    results = scan(service, symbol_filter=lambda symbol: coordinator.shard_of(symbol) in shards)
+    coordinator.publish(results, shards)
+    if coordinator.elect_leader():
+        coordinator.housekeeping()
+
+    # Each node carries 1/N of the weight, so a sweep can come round N times as often
+    if scheduler is not None:
+        scheduler.sweep_interval = coordinator.scan_interval(SCAN_INTERVAL)
+    else:
+        service.interval = coordinator.scan_interval(SCAN_INTERVAL)
+    return coordinator.snapshot()
+
+# === SCAN HISTORY ===
+@st.cache_resource
+def get_scan_history():
+    return ScanHistory(HISTORY_DB)
+
+def format_age(seconds):
+    return f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m"
+
+def render_history(history, symbols):
+    spent = []
+
+    def timed(query, *args, **kwargs):
+        started = time.perf_counter()
+        out = query(*args, **kwargs)
+        spent.append(time.perf_counter() - started)
+        return out
+
+    with st.expander("📜 Scan history"):
+        col1, col2 = st.columns(2)
+        with col1:
+            category = st.selectbox("In bucket", CATEGORIES, format_func=lambda c: c.replace('_', ' ').title())
+            now = time.time()
+            st.dataframe([{'Symbol': symbol, 'Since': f"{datetime.fromtimestamp(since):%m-%d %H:%M}", 'For': format_age(now - since)}
+                          for symbol, since in timed(history.bucket_streaks, category)], hide_index=True)
+        with col2:
+            symbol = st.selectbox("Symbol", sorted(symbols))
+            streak = timed(history.streak, symbol) if symbol else None
+            if streak:
+                bucket, since = streak
+                where = bucket.replace('_', ' ') if bucket else "no bucket"
+                st.caption(f"{symbol} has been in {where} since {datetime.fromtimestamp(since):%m-%d %H:%M} ({format_age(time.time() - since)})")
+            rows = [row for row in timed(history.symbol_history, symbol, since=time.time() - 86400) if 'm15_rsi' in row] if symbol else []
+            if rows:
+                chart = pd.DataFrame(rows)
+                chart['scan_time'] = pd.to_datetime(chart['scan_time'], unit='s')
+                st.line_chart(chart.set_index('scan_time')[['m15_rsi', 'h1_rsi', 'h4_rsi']])
+        st.caption(f"History queries took {sum(spent) * 1000:.0f} ms")
+
+# One scanner per process on its own clock; pages only read its snapshots
+@st.cache_resource
+def get_scan_service():
+    cache = get_kline_cache()
+    history = get_scan_history() if USE_SCAN_HISTORY else None
+
+    def on_scan(snapshot):
+        save_latest_results(snapshot['results'])
+        if history:
+            # Only symbols gone from exchangeInfo are closed; a missed fetch keeps a symbol's last state
+            history.record(snapshot['results'], snapshot['scan_time'], snapshot['duration'],
+                           get_symbol_universe().last_diff['delisted'])
+
+    schedule = None
+    if CLOSED_CANDLES_ONLY:
+        # Wake just after each close of the shortest timeframe
+        tracker, scheduler, interval = ClosedCandleTracker(), None, SCAN_INTERVAL
+        schedule = lambda: seconds_to_next_close(TIMEFRAMES[0])
+        scan = lambda service, symbol_filter=None: scan_closed_candles(service, cache, tracker, symbol_filter)
+    else:
+        scheduler = PriorityScheduler(SCHEDULER_TICK, SCAN_INTERVAL) if USE_PRIORITY_SCHEDULER else None
+        interval = SCHEDULER_TICK if USE_PRIORITY_SCHEDULER else SCAN_INTERVAL
+        scan = lambda service, symbol_filter=None: scan_market(service, cache, scheduler, symbol_filter)
+    if SHARD_DB:
+        coordinator = get_coordinator()
+        return ScanService(lambda service: scan_shard(service, coordinator, scan, scheduler), interval, schedule, on_scan).start()
+    return ScanService(scan, interval, schedule, on_scan).start()
+
+def load_signal_results(results, updated_at, apply_momentum_filter=True, apply_rsi_filter=True):
+    categories = ['bullish_in_range', 'bullish_range_break', 'bearish_in_range', 'bearish_range_break']
+    previous = buckets_by_symbol(st.session_state.scan_results, categories)
+    buckets = classify_signals(dict(sorted(results.items())), apply_momentum_filter, apply_rsi_filter)
+    for category in categories:
+        st.session_state.scan_results[category] = buckets[category]
+
+    scan_time = datetime.fromtimestamp(updated_at).strftime("%Y-%m-%d_%H-%M-%S")
+    if st.session_state.scan_results.get('scan_time') != scan_time:
+        # Bucket moves since the snapshot this session last showed
+        if st.session_state.scan_results.get('scan_time'):
+            current = buckets_by_symbol(st.session_state.scan_results, categories)
+            st.session_state.scan_results['changes'] = bucket_changes(previous, current)
+        st.session_state.scan_results['scan_time'] = scan_time
+
+def render_changes(events):
+    entered = [f"{symbol} ({new.replace('_', ' ')})" for symbol, old, new in events if new]
+    left = [symbol for symbol, old, new in events if old and not new]
+    if entered or left:
+        st.caption(f"🔀 Since the last scan — entered: {', '.join(entered) or 'none'} — left: {', '.join(left) or 'none'}")
+
+# Save latest results to disk, once per scan from the service (or stream) thread rather than
+# per session; files carry the default filters, sessions only read them
+def save_latest_results(results):
+    buckets = classify_signals(dict(sorted(results.items())))
     for category in ['bullish_in_range', 'bullish_range_break', 'bearish_in_range', 'bearish_range_break']:
-        symbols = st.session_state.scan_results[category]
+        symbols = buckets[category]
         if symbols:
             txt_data = "\n".join([f"BINANCE:{s}.P" for s in sorted(symbols)])
             csv_data = pd.DataFrame({
@@ -181,91 +459,6 @@ def load_latest_file(category, filetype):
     except FileNotFoundError:
         return None
 
-# === MAIN SCAN FUNCTION ===
-def run_scanner(apply_momentum_filter=True, apply_rsi_filter=True):
-    
-    # Clear both persistent and live results
-    for category in ['bullish_in_range', 'bullish_range_break', 'bearish_in_range', 'bearish_range_break']:
-        st.session_state.scan_results[category] = []
-        st.session_state.scan_results['live_results'][category] = []
-
-    symbols = get_futures_symbols(TEST_MODE)
-    total_symbols = len(symbols)
-
-    # Initialize live display containers
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    # Create columns for live results
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.subheader("🐂 Bullish - In Range")
-        live_bullish_in_range = st.empty()
-    with col2:
-        st.subheader("🚀 Bullish - Range Break")
-        live_bullish_break = st.empty()
-    with col3:
-        st.subheader("🐻 Bearish - In Range")
-        live_bearish_in_range = st.empty()
-    with col4:
-        st.subheader("💥 Bearish - Range Break")
-        live_bearish_break = st.empty()
-
-    for i, symbol in enumerate(symbols):
-        # Update progress
-        progress = (i + 1) / total_symbols
-        st.session_state.current_progress = progress
-        st.session_state.current_symbol = symbol
-        progress_bar.progress(progress)
-        status_text.text(f"🔍 Scanning {symbol} ({i+1}/{total_symbols})")
-        
-        # Classify token
-        classification = classify_token(symbol, apply_momentum_filter, apply_rsi_filter)
-        
-        # Update results
-        if classification:
-            # Avoid duplicates in live_results and main list
-            if symbol not in st.session_state.scan_results['live_results'][classification]:
-                st.session_state.scan_results['live_results'][classification].append(symbol)
-            if symbol not in st.session_state.scan_results[classification]:
-                st.session_state.scan_results[classification].append(symbol)
-
-            
-            # Update live displays
-            live_bullish_in_range.markdown(
-                f"`{', '.join(st.session_state.scan_results['live_results']['bullish_in_range'])}`"
-                if st.session_state.scan_results['live_results']['bullish_in_range']
-                else "None"
-            )
-
-            live_bullish_break.markdown(
-                f"`{', '.join(st.session_state.scan_results['live_results']['bullish_range_break'])}`"
-                if st.session_state.scan_results['live_results']['bullish_range_break']
-                else "None"
-            )
-
-            live_bearish_in_range.markdown(
-                f"`{', '.join(st.session_state.scan_results['live_results']['bearish_in_range'])}`"
-                if st.session_state.scan_results['live_results']['bearish_in_range']
-                else "None"
-            )
-
-            live_bearish_break.markdown(
-                f"`{', '.join(st.session_state.scan_results['live_results']['bearish_range_break'])}`"
-                if st.session_state.scan_results['live_results']['bearish_range_break']
-                else "None"
-            )
-
-        
-        time.sleep(0.075)  # Rate limiting
-    
-    # Finalize results
-    st.session_state.scan_results['scan_time'] = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    progress_bar.empty()
-    save_latest_results()
-    status_text.success("✅ Scan completed!")
-
 #Wrap Buttons
 def render_download_buttons(label_prefix, data_list, category, timestamp, col):
     with col:
@@ -303,15 +496,18 @@ def render_download_buttons(label_prefix, data_list, category, timestamp, col):
 st.set_page_config(page_title="Binance Trend Scanner", layout="wide")
 st.title("📈 Binance Futures Trend Scanner")
 
-st.sidebar.header("🔧 Settings")
+if EXPOSE_METRICS:
+    metrics.serve()
 
-# Test mode toggle
-TEST_MODE = st.sidebar.checkbox("Test Mode (Limit to 50 tokens)", value=False)
+st.sidebar.header("🔧 Settings")
 
 # Filter toggles
 apply_momentum_filter = st.sidebar.checkbox("Apply Momentum Filter (MA fans)", value=False)
 apply_rsi_filter = st.sidebar.checkbox("Apply RSI Filter", value=True)
 
+# Ingestion mode
+STREAM_MODE = st.sidebar.checkbox("Live Stream Mode (WebSocket klines)", value=False)
+
 st.markdown("""
 Scan for trending Binance USDT Perpetual tokens using:
 - 21/55/100 EMAs on 15m
@@ -332,38 +528,60 @@ st.session_state.scan_results['live_results'] = {
 
 from streamlit_autorefresh import st_autorefresh
 
-# Get current time
-now = datetime.now()
-
-# Compute time until the next 5-minute mark
-minutes = now.minute
-seconds = now.second
-
-# How many minutes to add to reach next 5-minute mark
-minutes_to_next_five = (5 - (minutes % 5)) % 5
-seconds_to_next_run = (minutes_to_next_five * 60) - seconds
-if seconds_to_next_run <= 0:
-    seconds_to_next_run += 300  # Avoid negative or 0 delay
-
-# Refresh interval in milliseconds
-refresh_interval_ms = seconds_to_next_run * 1000
-
-# Sync to next 5-minute mark
-st_autorefresh(interval=refresh_interval_ms, key="clock_sync_refresh")
-
-# Auto-run on load
-run_scanner(apply_momentum_filter, apply_rsi_filter)
+if STREAM_MODE:
+    # Candles arrive over the websocket; the page only re-reads the latest classifications
+    st_autorefresh(interval=STREAM_REFRESH_MS, key="stream_refresh")
+    stream = get_kline_stream(TEST_MODE)
+    if stream.last_update:
+        load_signal_results(stream.results, stream.last_update, apply_momentum_filter, apply_rsi_filter)
+        st.caption(f"📡 Streaming {len(stream.symbols)} symbols — {len(stream.results)} evaluated, last update {datetime.fromtimestamp(stream.last_update):%H:%M:%S}")
+    else:
+        st.info(f"📡 Seeding candle buffers for {len(stream.symbols)} symbols...")
+else:
+    # The scan runs on the service's own clock; the page only re-reads its snapshot
+    st_autorefresh(interval=PAGE_REFRESH_MS, key="snapshot_refresh")
+    service = get_scan_service()
+    snapshot = service.latest()
+    progress = service.progress
+
+    if progress['running'] and progress['total']:
+        st.progress(progress['done'] / progress['total'], text=f"🔍 Scanning {progress['symbol']} ({progress['done']}/{progress['total']})")
+
+    if snapshot['scan_time']:
+        # Sharded: every node's latest results, not just what this node had at its last pass
+        results = get_coordinator().snapshot() if SHARD_DB else snapshot['results']
+        load_signal_results(results, snapshot['scan_time'], apply_momentum_filter, apply_rsi_filter)
+        wait = service.schedule() if service.schedule else seconds_to_next_run(service.interval)
+        next_scan = datetime.now() + timedelta(seconds=wait)
+        st.caption(f"✅ Last scan {datetime.fromtimestamp(snapshot['scan_time']):%H:%M:%S} took {snapshot['duration']:.0f}s — next scan at {next_scan:%H:%M}")
+        universe_diff = get_symbol_universe().last_diff
+        if universe_diff['added'] or universe_diff['delisted']:
+            st.caption(f"🆕 Listed: {', '.join(universe_diff['added']) or 'none'} — 🗑️ Delisted: {', '.join(universe_diff['delisted']) or 'none'}")
+        render_changes(st.session_state.scan_results.get('changes', []))
+        if SHARD_DB:
+            coordinator = get_coordinator()
+            st.caption(f"🧩 This node scans {len(coordinator.shards)}/{SHARD_COUNT} shards — {len(coordinator.live_nodes())} nodes live")
+        if metrics.last_summary:
+            with st.expander("⏱️ Last scan timing"):
+                st.dataframe(metrics.last_summary, hide_index=True)
+        if USE_SCAN_HISTORY:
+            render_history(get_scan_history(), results)
+    elif snapshot['error']:
+        st.error(f"Scan failed: {snapshot['error']}")
+    else:
+        st.info("⏳ First scan in progress...")
 
-# Optional: Manual trigger
-if st.button("🔁 Refresh Trend Scan"):
-    run_scanner(apply_momentum_filter, apply_rsi_filter)
+    # Optional: Manual trigger
+    if st.button("🔁 Refresh Trend Scan"):
+        service.trigger()
 
 # Display only live results with download buttons
 if st.session_state.scan_results['scan_time']:
-    col1, col2, col3, col4 = st.columns(4)
-    timestamp = st.session_state.scan_results['scan_time']
-
-    render_download_buttons("🐂 Bullish - In Range", st.session_state.scan_results['bullish_in_range'], "Bullish - In Range", timestamp, col1)
-    render_download_buttons("🚀 Bullish - Range Break", st.session_state.scan_results['bullish_range_break'], "Bullish - Range Break", timestamp, col2)
-    render_download_buttons("🐻 Bearish - In Range", st.session_state.scan_results['bearish_in_range'], "Bearish - In Range", timestamp, col3)
-    render_download_buttons("💥 Bearish - Range Break", st.session_state.scan_results['bearish_range_break'], "Bearish - Range Break", timestamp, col4)
\ No newline at end of file
+    with metrics.stage("render"):
+        col1, col2, col3, col4 = st.columns(4)
+        timestamp = st.session_state.scan_results['scan_time']
+
+        render_download_buttons("🐂 Bullish - In Range", st.session_state.scan_results['bullish_in_range'], "Bullish - In Range", timestamp, col1)
+        render_download_buttons("🚀 Bullish - Range Break", st.session_state.scan_results['bullish_range_break'], "Bullish - Range Break", timestamp, col2)
+        render_download_buttons("🐻 Bearish - In Range", st.session_state.scan_results['bearish_in_range'], "Bearish - In Range", timestamp, col3)
+        render_download_buttons("💥 Bearish - Range Break", st.session_state.scan_results['bearish_range_break'], "Bearish - Range Break", timestamp, col4)
\ No newline at end of file
@@ -0,0 +1,326 @@
+import streamlit as st
+import http_session
+import pandas as pd
+import asyncio
+import aiohttp
+import time
+from datetime import datetime
+from functools import partial
+from streamlit_autorefresh import st_autorefresh
+from rate_limiter import limiter, request_weight, DEFAULT_BAN_SECONDS
+from kline_cache import KlineCache
+from candle_archive import CandleArchive, ARCHIVE_DIR
+from kline_decode import loads, rows_to_array, CLASSIFIER_FIELDS
+from batch_indicators import classify_batch, TIMEFRAMES, CATEGORIES, KLINE_WINDOWS
+from liquidity import LiquidityFilter
+from symbol_universe import SymbolUniverse, UNIVERSE_FILE
+from scan_service import seconds_to_next_run
+from live_buckets import LiveBuckets, buckets_by_symbol
+
+# Initialize session state
+if 'scan_results' not in st.session_state:
+    st.session_state.scan_results = {
+        'bullish_in_range': [],
+        'bullish_range_break': [],
+        'bearish_in_range': [],
+        'bearish_range_break': [],
+        'scan_time': None,
+        'current_progress': 0,
+        'current_symbol': '',
+        'live_results': {
+            'bullish_in_range': [],
+            'bullish_range_break': [],
+            'bearish_in_range': [],
+            'bearish_range_break': []
+        }
+    }
+
+# === CONFIG ===
+BASE_URL = "https://fapi.binance.com"
+TEST_SYMBOLS_COUNT = 50
+MAX_CONCURRENT_REQUESTS = 20  # requests in flight; pacing is left to the shared weight limiter
+KEEPALIVE_TIMEOUT = 60  # seconds an idle pooled connection is kept open
+REQUEST_TIMEOUT = 10  # seconds per request, including the body
+MAX_RETRIES = 2
+USE_LIQUIDITY_FILTER = True  # drop low-turnover symbols via one bulk 24h ticker call
+USE_CANDLE_ARCHIVE = True  # persist closed candles to ARCHIVE_DIR and warm-start from them
+
+# === SYMBOLS (sync, cached; refreshed a few times an hour at most) ===
+def fetch_json(path, params=None):
+    limiter.acquire(request_weight(path, params))
+    response = http_session.get(f"{BASE_URL}{path}", params=params, timeout=REQUEST_TIMEOUT)
+    limiter.update_from_headers(response.headers)
+    response.raise_for_status()
+    return loads(response.content)
+
+@st.cache_resource
+def get_symbol_universe():
+    return SymbolUniverse(fetch_json, UNIVERSE_FILE)
+
+@st.cache_resource
+def get_liquidity_filter():
+    return LiquidityFilter(fetch_json)
+
+def get_scan_symbols(test_mode=False):
+    try:
+        symbols = [s for s in get_symbol_universe().symbols() if not s.endswith('BUSD')]
+    except Exception as e:
+        st.error(f"⚠️ Error fetching Binance data: {e}")
+        return []
+    symbols = symbols[:TEST_SYMBOLS_COUNT] if test_mode else symbols
+    return get_liquidity_filter().apply(symbols) if USE_LIQUIDITY_FILTER else symbols
+
+# One candle store per process, shared by every session and rerun
+@st.cache_resource
+def get_kline_cache():
+    archive = CandleArchive(ARCHIVE_DIR) if USE_CANDLE_ARCHIVE else None
+    return KlineCache(None, archive=archive)  # each scan passes its own async fetch
+
+# === ASYNC API REQUESTS ===
+async def safe_api_request(session, semaphore, url, params=None):
+    retries = 0
+    weight = request_weight(url, params)
+
+    while retries <= MAX_RETRIES:
+        async with semaphore:
+            # Process-wide budget shared with every other session on this IP
+            await limiter.acquire_async(weight)
+
+            try:
+                async with session.get(url, params=params) as response:
+                    limiter.update_from_headers(response.headers)
+
+                    if response.status == 429:
+                        wait_time = int(response.headers.get('Retry-After', 10))
+                        limiter.backoff(wait_time)
+                        st.error(f"🔴 Rate limited! Waiting {wait_time}s (Retry {retries+1}/{MAX_RETRIES})")
+                        retries += 1
+                        continue
+
+                    if response.status == 418:  # IP banned
+                        limiter.backoff(int(response.headers.get('Retry-After', DEFAULT_BAN_SECONDS)))
+                        st.error("🔴 IP Banned - Stop all requests and wait")
+                        return None
+
+                    response.raise_for_status()
+                    return loads(await response.read())
+
+            except Exception as e:
+                retries += 1
+                wait_time = min(2 ** retries, 10)  # Exponential backoff
+                st.warning(f"⚠️ Error: {str(e)} - Retrying in {wait_time}s")
+        await asyncio.sleep(wait_time)  # outside the semaphore so the slot isn't idle
+
+    st.error(f"❌ Failed after {MAX_RETRIES} retries")
+    return None
+
+async def fetch_klines(session, semaphore, params):
+    return await safe_api_request(session, semaphore, f"{BASE_URL}/fapi/v1/klines", params)
+
+# === CLASSIFICATION ===
+async def classify_token(fetch, symbol, apply_momentum_filter=True, apply_rsi_filter=True):
+    try:
+        # All three timeframes in flight at once, each only as deep as its indicators need;
+        # rescans only pull what's new
+        cache = get_kline_cache()
+        windows = await asyncio.gather(*(
+            cache.get_async(symbol, interval, KLINE_WINDOWS[interval], fetch) for interval in TIMEFRAMES
+        ))
+        if any(not rows for rows in windows):
+            return None
+
+        closes = {interval: rows_to_array(rows, CLASSIFIER_FIELDS)['close'] for interval, rows in zip(TIMEFRAMES, windows)}
+        buckets = classify_batch({symbol: closes}, apply_momentum_filter, apply_rsi_filter)
+        return next((category for category in CATEGORIES if buckets[category]), None)
+
+    except Exception as e:
+        st.error(f"Error classifying {symbol}: {str(e)}")
+        return None
+
+# Save latest results to disk
+def save_latest_results():
+    timestamp = st.session_state.scan_results['scan_time']
+    for category in ['bullish_in_range', 'bullish_range_break', 'bearish_in_range', 'bearish_range_break']:
+        symbols = st.session_state.scan_results[category]
+        if symbols:
+            txt_data = "\n".join([f"BINANCE:{s}.P" for s in sorted(symbols)])
+            csv_data = pd.DataFrame({
+                "Symbol": [f"{s}.P" for s in sorted(symbols)],
+                "Category": [category.replace('_', ' ').title()] * len(symbols)
+            }).to_csv(index=False)
+
+            with open(f"latest_{category}.txt", "w") as f:
+                f.write(txt_data)
+            with open(f"latest_{category}.csv", "w") as f:
+                f.write(csv_data)
+
+#Load latest file
+def load_latest_file(category, filetype):
+    filename = f"latest_{category}.{filetype}"
+    try:
+        with open(filename, "r" if filetype == "txt" else "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+# === MAIN SCAN FUNCTION ===
+async def run_scanner_async(apply_momentum_filter=True, apply_rsi_filter=True):
+
+    # Start from this session's previous buckets; the scan only sends what moves
+    previous = buckets_by_symbol(st.session_state.scan_results, CATEGORIES)
+
+    started = time.perf_counter()
+    weight_before = limiter.total_weight
+    symbols = await asyncio.to_thread(get_scan_symbols, TEST_MODE)
+    total_symbols = len(symbols)
+
+    # Initialize live display containers
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    # Create columns for live results
+    col1, col2, col3, col4 = st.columns(4)
+    placeholders = {}
+
+    with col1:
+        st.subheader("🐂 Bullish - In Range")
+        placeholders['bullish_in_range'] = st.empty()
+    with col2:
+        st.subheader("🚀 Bullish - Range Break")
+        placeholders['bullish_range_break'] = st.empty()
+    with col3:
+        st.subheader("🐻 Bearish - In Range")
+        placeholders['bearish_in_range'] = st.empty()
+    with col4:
+        st.subheader("💥 Bearish - Range Break")
+        placeholders['bearish_range_break'] = st.empty()
+
+    def render_bucket(category, bucket_symbols):
+        placeholders[category].markdown(f"`{', '.join(bucket_symbols)}`" if bucket_symbols else "None")
+
+    live = LiveBuckets(CATEGORIES, render_bucket, initial=previous)
+    live.drop_missing(symbols)
+
+    # Pooled keep-alive connections, at most MAX_CONCURRENT_REQUESTS requests in flight
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        fetch = partial(fetch_klines, session, semaphore)
+
+        async def scan(symbol):
+            return symbol, await classify_token(fetch, symbol, apply_momentum_filter, apply_rsi_filter)
+
+        # Results arrive in order of completion
+        for done, task in enumerate(asyncio.as_completed([scan(s) for s in symbols]), start=1):
+            symbol, classification = await task
+            live.update(symbol, classification)
+
+            # Progress and changed columns are redrawn at RENDER_FPS, not per symbol
+            if live.frame():
+                progress = done / total_symbols
+                st.session_state.current_progress = progress
+                st.session_state.current_symbol = symbol
+                progress_bar.progress(progress)
+                status_text.text(f"🔍 Scanning {symbol} ({done}/{total_symbols})")
+
+    # Finalize results
+    live.frame(force=True)
+    for category, bucket_symbols in live.results().items():
+        st.session_state.scan_results[category] = bucket_symbols
+        st.session_state.scan_results['live_results'][category] = list(bucket_symbols)
+    st.session_state.scan_results['scan_time'] = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    progress_bar.empty()
+    save_latest_results()
+    status_text.success(f"✅ Scan completed! {total_symbols} symbols in {time.perf_counter() - started:.1f}s "
+                        f"({limiter.total_weight - weight_before} request weight)")
+    render_changes(live.events)
+
+def render_changes(events):
+    entered = [f"{symbol} ({new.replace('_', ' ')})" for symbol, old, new in events if new]
+    left = [symbol for symbol, old, new in events if old and not new]
+    if entered or left:
+        st.caption(f"🔀 Since the last scan — entered: {', '.join(entered) or 'none'} — left: {', '.join(left) or 'none'}")
+
+def run_scanner(apply_momentum_filter=True, apply_rsi_filter=True):
+    asyncio.run(run_scanner_async(apply_momentum_filter, apply_rsi_filter))
+
+#Wrap Buttons
+def render_download_buttons(label_prefix, data_list, category, timestamp, col):
+    with col:
+        st.subheader(label_prefix)
+        st.write([f"{s}.P" for s in data_list] or "None")
+
+        if data_list:
+            txt_data = "\n".join([f"BINANCE:{s}.P" for s in sorted(data_list)])
+            csv_data = pd.DataFrame({
+                "Symbol": [f"{s}.P" for s in data_list],
+                "Category": [category] * len(data_list)
+            }).to_csv(index=False).encode('utf-8')
+
+            st.download_button(
+                label="📋 TXT Export",
+                data=txt_data,
+                file_name=f"kaiju_{label_prefix.lower().replace(' ', '_')}_bfuscan_{timestamp}.txt",
+                mime="text/plain",
+                key=f"{label_prefix.lower().replace(' ', '_')}_txt_{timestamp}"
+            )
+            st.download_button(
+                label="📁 CSV Export",
+                data=csv_data,
+                file_name=f"kaiju_{label_prefix.lower().replace(' ', '_')}_bfuscan_{timestamp}.csv",
+                mime="text/csv",
+                key=f"{label_prefix.lower().replace(' ', '_')}_csv_{timestamp}"
+            )
+        else:
+            st.button(f"📋 TXT Export (No Data)", disabled=True, key=f"{label_prefix.lower().replace(' ', '_')}_txt_disabled_{timestamp}")
+            st.button(f"📁 CSV Export (No Data)", disabled=True, key=f"{label_prefix.lower().replace(' ', '_')}_csv_disabled_{timestamp}")
+
+
+# === STREAMLIT APP ===
+
+st.set_page_config(page_title="Binance Trend Scanner", layout="wide")
+st.title("📈 Binance Futures Trend Scanner")
+
+st.sidebar.header("🔧 Settings")
+
+# Test mode toggle
+TEST_MODE = st.sidebar.checkbox("Test Mode (Limit to 50 tokens)", value=False)
+
+# Filter toggles
+apply_momentum_filter = st.sidebar.checkbox("Apply Momentum Filter (MA fans)", value=False)
+apply_rsi_filter = st.sidebar.checkbox("Apply RSI Filter", value=True)
+
+st.markdown("""
+Scan for trending Binance USDT Perpetual tokens using:
+- 21/55/100 EMAs on 15m
+- 7/30/100 SMAs on 1h
+- RSI filters for precise entry points
+""")
+
+st.session_state.scan_results['live_results'] = {
+    'bullish_in_range': [],
+    'bullish_range_break': [],
+    'bearish_in_range': [],
+    'bearish_range_break': []
+}
+
+# Sync to next 5-minute mark
+st_autorefresh(interval=seconds_to_next_run() * 1000, key="clock_sync_refresh")
+
+# Auto-run on load
+run_scanner(apply_momentum_filter, apply_rsi_filter)
+
+# Optional: Manual trigger
+if st.button("🔁 Refresh Trend Scan"):
+    run_scanner(apply_momentum_filter, apply_rsi_filter)
+
+# Display only live results with download buttons
+if st.session_state.scan_results['scan_time']:
+    col1, col2, col3, col4 = st.columns(4)
+    timestamp = st.session_state.scan_results['scan_time']
+
+    render_download_buttons("🐂 Bullish - In Range", st.session_state.scan_results['bullish_in_range'], "Bullish - In Range", timestamp, col1)
+    render_download_buttons("🚀 Bullish - Range Break", st.session_state.scan_results['bullish_range_break'], "Bullish - Range Break", timestamp, col2)
+    render_download_buttons("🐻 Bearish - In Range", st.session_state.scan_results['bearish_in_range'], "Bearish - In Range", timestamp, col3)
+    render_download_buttons("💥 Bearish - Range Break", st.session_state.scan_results['bearish_range_break'], "Bearish - Range Break", timestamp, col4)
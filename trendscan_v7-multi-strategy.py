@@ -0,0 +1,272 @@
+import streamlit as st
+import http_session
+import pandas as pd
+import asyncio
+import aiohttp
+import time
+from datetime import datetime
+from functools import partial
+from streamlit_autorefresh import st_autorefresh
+from rate_limiter import limiter, request_weight, DEFAULT_BAN_SECONDS
+from kline_cache import KlineCache
+from candle_archive import CandleArchive, ARCHIVE_DIR
+from kline_decode import loads, rows_to_array, CLASSIFIER_FIELDS
+from liquidity import LiquidityFilter
+from symbol_universe import SymbolUniverse, UNIVERSE_FILE
+from scan_service import seconds_to_next_run
+from strategy_rules import STRATEGIES
+from multi_strategy import StrategySet
+
+# Initialize session state
+if 'scan_results' not in st.session_state:
+    st.session_state.scan_results = {
+        'strategies': {},  # strategy -> {category: [symbols]}
+        'scan_time': None,
+    }
+
+# === CONFIG ===
+BASE_URL = "https://fapi.binance.com"
+TEST_SYMBOLS_COUNT = 50
+MAX_CONCURRENT_REQUESTS = 20  # requests in flight; pacing is left to the shared weight limiter
+KEEPALIVE_TIMEOUT = 60  # seconds an idle pooled connection is kept open
+REQUEST_TIMEOUT = 10  # seconds per request, including the body
+MAX_RETRIES = 2
+USE_LIQUIDITY_FILTER = True  # drop low-turnover symbols via one bulk 24h ticker call
+USE_CANDLE_ARCHIVE = True  # persist closed candles to ARCHIVE_DIR and warm-start from them
+
+CATEGORY_LABELS = {
+    'bullish': "📈 Bullish",
+    'bearish': "📉 Bearish",
+    'bullish_in_range': "🐂 Bullish - In Range",
+    'bullish_range_break': "🚀 Bullish - Range Break",
+    'bearish_in_range': "🐻 Bearish - In Range",
+    'bearish_range_break': "💥 Bearish - Range Break",
+}
+
+# === SYMBOLS (sync, cached; refreshed a few times an hour at most) ===
+def fetch_json(path, params=None):
+    limiter.acquire(request_weight(path, params))
+    response = http_session.get(f"{BASE_URL}{path}", params=params, timeout=REQUEST_TIMEOUT)
+    limiter.update_from_headers(response.headers)
+    response.raise_for_status()
+    return loads(response.content)
+
+@st.cache_resource
+def get_symbol_universe():
+    return SymbolUniverse(fetch_json, UNIVERSE_FILE)
+
+@st.cache_resource
+def get_liquidity_filter():
+    return LiquidityFilter(fetch_json)
+
+def get_scan_symbols(test_mode=False):
+    try:
+        symbols = [s for s in get_symbol_universe().symbols() if not s.endswith('BUSD')]
+    except Exception as e:
+        st.error(f"⚠️ Error fetching Binance data: {e}")
+        return []
+    symbols = symbols[:TEST_SYMBOLS_COUNT] if test_mode else symbols
+    return get_liquidity_filter().apply(symbols) if USE_LIQUIDITY_FILTER else symbols
+
+# One candle store per process, shared by every session and rerun
+@st.cache_resource
+def get_kline_cache():
+    archive = CandleArchive(ARCHIVE_DIR) if USE_CANDLE_ARCHIVE else None
+    return KlineCache(None, archive=archive)  # each scan passes its own async fetch
+
+# Compiled once per process; the selection only picks which results are shown
+@st.cache_resource
+def get_strategy_set(names):
+    return StrategySet({name: STRATEGIES[name] for name in names})
+
+# === ASYNC API REQUESTS ===
+async def safe_api_request(session, semaphore, url, params=None):
+    retries = 0
+    weight = request_weight(url, params)
+
+    while retries <= MAX_RETRIES:
+        async with semaphore:
+            # Process-wide budget shared with every other session on this IP
+            await limiter.acquire_async(weight)
+
+            try:
+                async with session.get(url, params=params) as response:
+                    limiter.update_from_headers(response.headers)
+
+                    if response.status == 429:
+                        wait_time = int(response.headers.get('Retry-After', 10))
+                        limiter.backoff(wait_time)
+                        st.error(f"🔴 Rate limited! Waiting {wait_time}s (Retry {retries+1}/{MAX_RETRIES})")
+                        retries += 1
+                        continue
+
+                    if response.status == 418:  # IP banned
+                        limiter.backoff(int(response.headers.get('Retry-After', DEFAULT_BAN_SECONDS)))
+                        st.error("🔴 IP Banned - Stop all requests and wait")
+                        return None
+
+                    response.raise_for_status()
+                    return loads(await response.read())
+
+            except Exception as e:
+                retries += 1
+                wait_time = min(2 ** retries, 10)  # Exponential backoff
+                st.warning(f"⚠️ Error: {str(e)} - Retrying in {wait_time}s")
+        await asyncio.sleep(wait_time)  # outside the semaphore so the slot isn't idle
+
+    st.error(f"❌ Failed after {MAX_RETRIES} retries")
+    return None
+
+async def fetch_klines(session, semaphore, params):
+    return await safe_api_request(session, semaphore, f"{BASE_URL}/fapi/v1/klines", params)
+
+async def fetch_closes(fetch, symbol, kline_windows):
+    """Close prices per timeframe for `symbol`, fetched once for every strategy, or None."""
+    try:
+        cache = get_kline_cache()
+        timeframes = list(kline_windows)
+        windows = await asyncio.gather(*(
+            cache.get_async(symbol, interval, kline_windows[interval], fetch) for interval in timeframes
+        ))
+        if any(not rows for rows in windows):
+            return None
+        return {interval: rows_to_array(rows, CLASSIFIER_FIELDS)['close'] for interval, rows in zip(timeframes, windows)}
+
+    except Exception as e:
+        st.error(f"Error fetching {symbol}: {str(e)}")
+        return None
+
+# Save latest results to disk
+def save_latest_results():
+    for name, buckets in st.session_state.scan_results['strategies'].items():
+        for category, symbols in buckets.items():
+            if symbols:
+                txt_data = "\n".join([f"BINANCE:{s}.P" for s in sorted(symbols)])
+                csv_data = pd.DataFrame({
+                    "Symbol": [f"{s}.P" for s in sorted(symbols)],
+                    "Category": [category.replace('_', ' ').title()] * len(symbols)
+                }).to_csv(index=False)
+
+                with open(f"latest_{name}_{category}.txt", "w") as f:
+                    f.write(txt_data)
+                with open(f"latest_{name}_{category}.csv", "w") as f:
+                    f.write(csv_data)
+
+# === MAIN SCAN FUNCTION ===
+async def run_scanner_async(strategies):
+    started = time.perf_counter()
+    weight_before = limiter.total_weight
+    symbols = await asyncio.to_thread(get_scan_symbols, TEST_MODE)
+    total_symbols = len(symbols)
+
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    # One fetch per (symbol, interval) however many strategies read it
+    frames = {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS, keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        fetch = partial(fetch_klines, session, semaphore)
+
+        async def load(symbol):
+            return symbol, await fetch_closes(fetch, symbol, strategies.windows)
+
+        for done, task in enumerate(asyncio.as_completed([load(s) for s in symbols]), start=1):
+            symbol, closes = await task
+            if closes is not None:
+                frames[symbol] = closes
+            progress_bar.progress(done / total_symbols)
+            status_text.text(f"🔍 Fetching {symbol} ({done}/{total_symbols})")
+
+    # Every strategy in one indicator pass over the shared candles
+    status_text.text(f"🧮 Evaluating {len(strategies.rules)} strategies")
+    st.session_state.scan_results['strategies'] = strategies.evaluate(dict(sorted(frames.items())))
+    st.session_state.scan_results['scan_time'] = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    progress_bar.empty()
+    save_latest_results()
+    status_text.success(f"✅ Scan completed! {total_symbols} symbols, {len(strategies.rules)} strategies in "
+                        f"{time.perf_counter() - started:.1f}s ({limiter.total_weight - weight_before} request weight)")
+
+def run_scanner(strategies):
+    asyncio.run(run_scanner_async(strategies))
+
+#Wrap Buttons
+def render_download_buttons(label_prefix, data_list, category, timestamp, col, key_prefix):
+    with col:
+        st.subheader(label_prefix)
+        st.write([f"{s}.P" for s in data_list] or "None")
+
+        key = f"{key_prefix}_{label_prefix.lower().replace(' ', '_')}"
+        if data_list:
+            txt_data = "\n".join([f"BINANCE:{s}.P" for s in sorted(data_list)])
+            csv_data = pd.DataFrame({
+                "Symbol": [f"{s}.P" for s in data_list],
+                "Category": [category] * len(data_list)
+            }).to_csv(index=False).encode('utf-8')
+
+            st.download_button(
+                label="📋 TXT Export",
+                data=txt_data,
+                file_name=f"kaiju_{key_prefix}_{label_prefix.lower().replace(' ', '_')}_bfuscan_{timestamp}.txt",
+                mime="text/plain",
+                key=f"{key}_txt_{timestamp}"
+            )
+            st.download_button(
+                label="📁 CSV Export",
+                data=csv_data,
+                file_name=f"kaiju_{key_prefix}_{label_prefix.lower().replace(' ', '_')}_bfuscan_{timestamp}.csv",
+                mime="text/csv",
+                key=f"{key}_csv_{timestamp}"
+            )
+        else:
+            st.button(f"📋 TXT Export (No Data)", disabled=True, key=f"{key}_txt_disabled_{timestamp}")
+            st.button(f"📁 CSV Export (No Data)", disabled=True, key=f"{key}_csv_disabled_{timestamp}")
+
+
+# === STREAMLIT APP ===
+
+st.set_page_config(page_title="Binance Trend Scanner", layout="wide")
+st.title("📈 Binance Futures Multi-Strategy Scanner")
+
+st.sidebar.header("🔧 Settings")
+
+# Test mode toggle
+TEST_MODE = st.sidebar.checkbox("Test Mode (Limit to 50 tokens)", value=False)
+
+# Strategies share one download, so adding one costs no extra request weight
+selected = st.sidebar.multiselect("Strategies", list(STRATEGIES), default=list(STRATEGIES))
+strategies = get_strategy_set(tuple(selected))
+
+st.markdown("""
+One scan, every strategy. Klines are fetched once per symbol and timeframe:
+- **v1**: 15m EMA and 1h SMA fans agree
+- **v1-h4**: 15m, 1h and 4h fans all agree
+- **rsi**: RSI buckets with the speed scanners' 4h limits
+- **v5**: RSI buckets as in the live auto-scanner
+- **momentum-off**: RSI buckets with no fan requirement
+""")
+
+# Sync to next 5-minute mark
+st_autorefresh(interval=seconds_to_next_run() * 1000, key="clock_sync_refresh")
+
+if selected:
+    # Auto-run on load
+    run_scanner(strategies)
+
+    # Optional: Manual trigger
+    if st.button("🔁 Refresh Strategy Scan"):
+        run_scanner(strategies)
+else:
+    st.info("Select at least one strategy in the sidebar.")
+
+# One tab per strategy, with download buttons per bucket
+results = st.session_state.scan_results['strategies']
+if st.session_state.scan_results['scan_time'] and results:
+    timestamp = st.session_state.scan_results['scan_time']
+    for tab, (name, buckets) in zip(st.tabs(list(results)), results.items()):
+        with tab:
+            for col, (category, symbols) in zip(st.columns(len(buckets)), buckets.items()):
+                label = CATEGORY_LABELS.get(category, category.replace('_', ' ').title())
+                render_download_buttons(label, symbols, label.split(' ', 1)[-1], timestamp, col, name)